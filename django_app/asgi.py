@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_app.settings')
 
 application = get_asgi_application()
+
+# only server processes listen for schema changes and build the dynamic models ahead of traffic,
+# management commands do not
+from tables.schema_events import start_listener  # noqa: E402
+from tables.warmup import warm_up_on_startup  # noqa: E402
+
+start_listener()
+warm_up_on_startup()
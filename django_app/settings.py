@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tables.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,3 +128,66 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Dynamic tables
+
+# Listen for schema changes made by other processes (PostgreSQL LISTEN/NOTIFY)
+# and evict their dynamic models from the local cache. Enable for multi-worker deployments.
+# The listener runs in processes serving the WSGI/ASGI application, forked workers included.
+TABLES_SCHEMA_LISTENER = False
+
+# Keyset pagination of `GET /table/<name>/rows?limit=&after=`. Reads without `limit`/`after` return
+# at most TABLES_ROWS_MAX_PAGE_SIZE rows too, with the `X-Rows-Truncated: true` header when there are more.
+TABLES_ROWS_PAGE_SIZE = 100
+TABLES_ROWS_MAX_PAGE_SIZE = 10000
+
+# Rows fetched per server-side cursor round trip by `GET /table/<name>/export`
+TABLES_EXPORT_CHUNK_SIZE = 2000
+
+# `POST /table/<name>/rows` bulk insert limits, rows per request and rows per INSERT statement
+TABLES_BULK_INSERT_MAX_ROWS = 10000
+TABLES_BULK_INSERT_BATCH_SIZE = 1000
+
+# Online (low-lock) schema changes through the table API: DDL gives up waiting for locks after
+# TABLES_DDL_LOCK_TIMEOUT and is retried with an exponential backoff, indexes are built concurrently
+# and column type changes are backfilled in batches of TABLES_BACKFILL_BATCH_SIZE rows.
+TABLES_ONLINE_SCHEMA_CHANGES = False
+TABLES_DDL_LOCK_TIMEOUT = '2s'
+TABLES_DDL_LOCK_RETRIES = 5
+TABLES_DDL_LOCK_RETRY_BACKOFF = 0.5
+TABLES_BACKFILL_BATCH_SIZE = 10000
+
+# Queue `PUT /table/<name>` updates changing column types as `SchemaChangeJob`s answered with
+# 202 Accepted, applied by `manage.py run_schema_jobs` outside the request workers.
+TABLES_ASYNC_SCHEMA_CHANGES = False
+# Runners report a heartbeat of their job every fifth of this many seconds, running jobs without one
+# for this long are marked failed, left behind by a runner that stopped.
+TABLES_SCHEMA_JOB_TIMEOUT = 300
+
+# Hot path timers and counters exposed on `/metrics` (Prometheus text format, per worker process),
+# with TABLES_METRICS_SERVER_TIMING also in the `Server-Timing` header of every response
+TABLES_METRICS = False
+TABLES_METRICS_SERVER_TIMING = False
+
+# Serve the row read and insert endpoints with native async views under ASGI (`django_app/asgi.py`)
+TABLES_ASYNC_ROW_VIEWS = False
+
+# 'eager' builds the models, serializers and row encoders of all tables when a worker loads the
+# WSGI/ASGI application (management commands do not), 'lazy' builds each one on its first request,
+# for very large catalogs
+TABLES_MODELS_WARMUP = 'lazy'
+
+# Responses of `GET /table/<name>/rows` and `/aggregate` carry an ETag of the schema and data versions
+# of the table, `If-None-Match` is answered with 304 without querying it. With a cache alias (`CACHES`)
+# the response bodies are also cached for TABLES_ROWS_CACHE_TIMEOUT seconds, keyed by the versions.
+TABLES_ROWS_CACHE = None
+TABLES_ROWS_CACHE_TIMEOUT = 300
+
+# `GET /table/<name>` descriptions are cached per worker and evicted by schema changes, with
+# TABLES_SCHEMA_LISTENER repeated calls make no queries. Row estimates are refreshed after this many seconds.
+TABLES_DESCRIBE_CACHE_TIMEOUT = 60
+
+# Dynamic models kept per worker, the least recently used ones are unregistered and rebuilt
+# on their next request. `None` keeps the models of all tables.
+TABLES_MODEL_CACHE_SIZE = 1000
@@ -16,7 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from tables.views import MetricsView
+
 urlpatterns = [
     path('api/', include('tables.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
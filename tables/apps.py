@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TablesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tables'
+
+    # the schema listener and the models warm-up are started by the WSGI/ASGI entry points,
+    # not by every process loading the app, e.g. management commands
@@ -0,0 +1,191 @@
+"""
+Native async row views for ASGI deployments, enabled with `TABLES_ASYNC_ROW_VIEWS`.
+
+DRF views are synchronous, under ASGI every request would occupy a thread of the
+sync thread pool while waiting for the database. These views mirror the row read
+and insert endpoints of `views.py` with plain Django async views and the async ORM.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from rest_framework import status
+
+from .bulk_rows import delete_rows, update_rows
+from .conditional import body_cache_enabled, get_cached_body, not_modified_response, set_cached_body, set_validators
+from .dynamic_models_factory import ModelFactory
+from .models import ModelSchema
+from .serializers import (
+    RowsMutationSerializer, RowsPageSerializer, RowValuesSerializer, dynamic_serializer_for_model,
+)
+from .views import TRUNCATED_HEADER, UNIQUE_VIOLATION_ERROR, truncate_rows
+
+
+async def aget_table(table_name):
+    """Return the schema and the model of the table, only a cache miss builds the model in a worker thread."""
+    schema = await ModelSchema.objects.aget(name=table_name)
+    model = ModelFactory(schema).get_cached_model()
+    if model is None:
+        model = await sync_to_async(schema.as_model)()
+    return schema, model
+
+
+async def ais_valid(serializer, model):
+    # unique columns are validated with a query, which has to run in a worker thread
+    if any(field.unique and not field.primary_key for field in model._meta.fields):
+        return await sync_to_async(serializer.is_valid)()
+    return serializer.is_valid()
+
+
+class AsyncRowsView(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # token-less JSON API, the same as the DRF views
+        view.csrf_exempt = True
+        return view
+
+    @staticmethod
+    def parse_json(request):
+        try:
+            return json.loads(request.body)
+        except ValueError:
+            return None
+
+
+class AsyncTableInsertRowView(AsyncRowsView):
+    async def post(self, request, table_name):
+        try:
+            schema, model = await aget_table(table_name)
+        except ModelSchema.DoesNotExist:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        data = self.parse_json(request)
+        if not isinstance(data, dict):
+            return JsonResponse({'detail': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = dynamic_serializer_for_model(model)(data=data)
+        if not await ais_valid(serializer, model):
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # a single INSERT in autocommit mode, no transaction needed
+            instance = await model.objects.acreate(**serializer.validated_data)
+        except IntegrityError:
+            return JsonResponse(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        await schema.abump_data_version()
+        return JsonResponse({'id': instance.pk}, status=status.HTTP_201_CREATED)
+
+
+class AsyncTableRowsView(AsyncRowsView):
+    async def get(self, request, table_name):
+        try:
+            schema, model = await aget_table(table_name)
+        except ModelSchema.DoesNotExist:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        params = RowsPageSerializer(data=request.GET, context={'model': model})
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        not_modified = not_modified_response(request, schema)
+        if not_modified is not None:
+            return set_validators(not_modified, schema)
+        # cache backends may do network I/O
+        body = await sync_to_async(get_cached_body)(schema, request) if body_cache_enabled() else None
+        if body is None:
+            body = await self.get_body(params)
+            if body_cache_enabled():
+                await sync_to_async(set_cached_body)(schema, request, body)
+        if params.is_paginated:
+            return set_validators(JsonResponse(body), schema)
+        rows, truncated = truncate_rows(body)
+        response = JsonResponse(rows, safe=False)
+        if truncated:
+            response[TRUNCATED_HEADER] = 'true'
+        return set_validators(response, schema)
+
+    @staticmethod
+    async def get_body(params):
+        encoder, queryset = params.get_encoder(), params.get_queryset()
+        if not params.is_paginated:
+            return await encoder.aencode_rows(queryset)
+
+        rows, next_cursor = await params.get_paginator().apaginate(
+            queryset, encoder, after=params.validated_data.get('after')
+        )
+        return {'results': rows, 'next': next_cursor}
+
+    async def post(self, request, table_name):
+        try:
+            schema, model = await aget_table(table_name)
+        except ModelSchema.DoesNotExist:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        data = self.parse_json(request)
+        if data is None:
+            return JsonResponse({'detail': 'Expected a JSON array.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = dynamic_serializer_for_model(model)(
+            data=data, many=True, allow_empty=False,
+            max_length=getattr(settings, 'TABLES_BULK_INSERT_MAX_ROWS', 10000),
+        )
+        if not await ais_valid(serializer, model):
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = {'rows': [{'index': i, 'errors': row_errors} for i, row_errors in enumerate(errors) if row_errors]}
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # all batches are inserted in one transaction
+            instances = await model.objects.abulk_create(
+                [model(**row) for row in serializer.validated_data],
+                batch_size=getattr(settings, 'TABLES_BULK_INSERT_BATCH_SIZE', 1000),
+            )
+        except IntegrityError:
+            return JsonResponse(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        await schema.abump_data_version()
+        return JsonResponse({'ids': [instance.pk for instance in instances]}, status=status.HTTP_201_CREATED)
+
+    async def patch(self, request, table_name):
+        try:
+            schema, model = await aget_table(table_name)
+        except ModelSchema.DoesNotExist:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        params = RowsMutationSerializer(data=request.GET, context={'model': model})
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        values = RowValuesSerializer(data=self.parse_json(request), context={'model': model})
+        if not values.is_valid():
+            return JsonResponse(values.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = model.objects.filter(params.validated_data['where'])
+        try:
+            # batches are committed one by one, in a single worker thread
+            rows, batches = await sync_to_async(update_rows)(
+                queryset, values.validated_data['set'], params.validated_data['batch_size']
+            )
+        except IntegrityError:
+            return JsonResponse(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        finally:
+            # batches committed before a failure changed the rows too
+            await schema.abump_data_version()
+        return JsonResponse({'rows': rows, 'batches': batches})
+
+    async def delete(self, request, table_name):
+        try:
+            schema, model = await aget_table(table_name)
+        except ModelSchema.DoesNotExist:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        params = RowsMutationSerializer(data=request.GET, context={'model': model})
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = model.objects.filter(params.validated_data['where'])
+        rows, batches = await sync_to_async(delete_rows)(queryset, params.validated_data['batch_size'])
+        await schema.abump_data_version()
+        return JsonResponse({'rows': rows, 'batches': batches})
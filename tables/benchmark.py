@@ -0,0 +1,192 @@
+"""Benchmarks of the dynamic table API, see the `bench_tables` command."""
+import itertools
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from rest_framework.test import APIClient
+
+from .dynamic_models_cache import ModelCache
+from .models import ModelSchema
+from .pagination import encode_cursor
+from .table_editor import TableEditor
+
+FIELD_TYPES = ['string', 'number', 'boolean']
+
+# values of generated rows, `g` is the row number from `generate_series()`
+SQL_VALUES = {
+    'TextField': "'value ' || g",
+    'FloatField': 'g * 1.5',
+    'BooleanField': 'mod(g, 2) = 0',
+}
+
+
+def summarize(samples):
+    """Latency statistics of `samples` in seconds, reported in milliseconds."""
+    samples = sorted(samples)
+    if len(samples) > 1:
+        percentiles = statistics.quantiles(samples, n=100, method='inclusive')
+        p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+@contextmanager
+def timer(results, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+class TableBenchmark:
+    """
+    Create a table of `columns` columns, load `rows` rows and measure model builds,
+    DDL, inserts and fetches through the API. The table is dropped afterwards.
+    """
+
+    def __init__(self, columns, rows, samples=100, batch_size=1000, host='localhost'):
+        self.columns = columns
+        self.rows = rows
+        self.samples = samples
+        self.batch_size = batch_size
+        self.name = f'bench_{columns}c_{rows}r'
+        self.client = APIClient(SERVER_NAME=host)
+        self.random = random.Random(columns * rows)
+
+    def table_data(self, extra_fields=()):
+        fields = [
+            {'name': f'c{i}', 'field_type': FIELD_TYPES[i % len(FIELD_TYPES)], 'args': {'null': True}}
+            for i in range(self.columns)
+        ]
+        return {'name': self.name, 'fields': [*fields, *extra_fields], 'indexes': []}
+
+    def make_row(self, n):
+        values = {'string': f'value {n}', 'number': n * 1.5, 'boolean': n % 2 == 0}
+        return {f'c{i}': values[FIELD_TYPES[i % len(FIELD_TYPES)]] for i in range(self.columns)}
+
+    def run(self):
+        if ModelSchema.objects.filter(name=self.name).exists():
+            raise ValueError(f"Table '{self.name}' already exists")
+
+        results = {'columns': self.columns, 'rows': self.rows}
+        ddl = results['ddl_s'] = {}
+        with timer(ddl, 'create_table'):
+            TableEditor(self.table_data()).create()
+        schema = ModelSchema.objects.get(name=self.name)
+        try:
+            with timer(results, 'load_s'):
+                self.load_rows(schema)
+            results['model_build'] = self.bench_model_build(schema)
+            results['insert'] = self.bench_insert()
+            results['fetch'] = self.bench_fetch(schema)
+            results['ddl_s'].update(self.bench_ddl())
+        finally:
+            with timer(ddl, 'drop_table'):
+                ModelSchema.objects.get(pk=schema.pk).delete()
+        return results
+
+    def load_rows(self, schema):
+        """Fill the table server side, loading is not measured through the API."""
+        model = schema.as_model()
+        fields = [field for field in model._meta.fields if not field.primary_key]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        values = ', '.join(SQL_VALUES[field.get_internal_type()] for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+                f'SELECT {values} FROM generate_series(1, %s) AS g',
+                [self.rows],
+            )
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def bench_model_build(self, schema):
+        cold, warm = [], []
+        for _ in range(self.samples):
+            ModelCache().evict(schema.pk)
+            start = time.perf_counter()
+            ModelSchema.objects.get(pk=schema.pk).as_model()
+            cold.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            ModelSchema.objects.get(pk=schema.pk).as_model()
+            warm.append(time.perf_counter() - start)
+        return {'cold': summarize(cold), 'cached': summarize(warm)}
+
+    def bench_insert(self):
+        single = []
+        for n in range(self.samples):
+            row = self.make_row(n)
+            start = time.perf_counter()
+            response = self.client.post(f'/api/table/{self.name}/row', data=row, format='json')
+            single.append(time.perf_counter() - start)
+            self.check(response, 201)
+
+        batches = max(1, self.samples // 10)
+        bulk = []
+        for batch in range(batches):
+            rows = [self.make_row(n) for n in range(batch * self.batch_size, (batch + 1) * self.batch_size)]
+            start = time.perf_counter()
+            response = self.client.post(f'/api/table/{self.name}/rows', data=rows, format='json')
+            bulk.append(time.perf_counter() - start)
+            self.check(response, 201)
+
+        return {
+            'single': {**summarize(single), 'rows_per_s': len(single) / sum(single)},
+            'bulk': {
+                **summarize(bulk), 'batch_size': self.batch_size,
+                'rows_per_s': batches * self.batch_size / sum(bulk),
+            },
+        }
+
+    def bench_fetch(self, schema):
+        model = schema.as_model()
+        max_pk = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        url = f'/api/table/{self.name}/rows'
+        first_page, random_page = [], []
+        for _ in range(self.samples):
+            start = time.perf_counter()
+            response = self.client.get(url, {'limit': 100})
+            first_page.append(time.perf_counter() - start)
+            self.check(response, 200)
+
+            pk = self.random.randint(0, max_pk)
+            cursor = encode_cursor({'order_by': 'id', 'value': pk, 'pk': pk})
+            start = time.perf_counter()
+            response = self.client.get(url, {'limit': 100, 'after': cursor})
+            random_page.append(time.perf_counter() - start)
+            self.check(response, 200)
+        return {'first_page': summarize(first_page), 'random_page': summarize(random_page), 'page_size': 100}
+
+    def bench_ddl(self):
+        results = {}
+        extra = {'name': 'bench_extra', 'field_type': 'string', 'args': {'null': True}}
+        with timer(results, 'add_column'):
+            TableEditor(self.table_data([extra])).update(self.name)
+
+        data = self.table_data([{**extra, 'field_type': 'number'}])
+        with timer(results, 'alter_column_type'):
+            TableEditor(data).update(self.name)
+
+        data['indexes'] = [{'columns': ['c0']}]
+        with timer(results, 'create_index'):
+            TableEditor(data).update(self.name)
+        return results
+
+    @staticmethod
+    def check(response, status_code):
+        if response.status_code != status_code:
+            raise RuntimeError(f'Unexpected response {response.status_code}: {response.content[:200]!r}')
+
+
+def run_benchmarks(columns, rows, **options):
+    return [TableBenchmark(c, r, **options).run() for c, r in itertools.product(columns, rows)]
@@ -0,0 +1,52 @@
+"""
+Set-based updates and deletes of the rows matching `where.` filters.
+
+A mutation is a single UPDATE/DELETE statement. With a batch size it is split into
+statements over `id` ranges of up to that many rows, each committed on its own, so a huge change
+does not hold its row locks until the end nor write all its WAL in one transaction.
+"""
+from django.db import transaction
+
+
+def id_ranges(queryset, batch_size):
+    """Yield `(after, upper)` `id` ranges of up to `batch_size` rows of the queryset, `None` is unbounded.
+
+    The bounds are the ids of the matching rows, so sparse ids do not cost empty statements.
+    """
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    after = None
+    while True:
+        remaining = ids if after is None else ids.filter(pk__gt=after)
+        upper = next(iter(remaining[batch_size - 1:batch_size]), None)
+        if upper is None:
+            if remaining.exists():
+                yield after, None
+            return
+        yield after, upper
+        after = upper
+
+
+def _run(queryset, statement, batch_size):
+    """Return the number of affected rows and of executed statements."""
+    if batch_size is None:
+        with transaction.atomic():
+            return statement(queryset), 1
+
+    rows = batches = 0
+    for after, upper in id_ranges(queryset, batch_size):
+        batch = queryset if after is None else queryset.filter(pk__gt=after)
+        if upper is not None:
+            batch = batch.filter(pk__lte=upper)
+        with transaction.atomic():
+            rows += statement(batch)
+        batches += 1
+    return rows, batches
+
+
+def update_rows(queryset, values, batch_size=None):
+    return _run(queryset, lambda batch: batch.update(**values), batch_size)
+
+
+def delete_rows(queryset, batch_size=None):
+    # dynamic models have no relations nor delete signals, `delete()` runs a single DELETE
+    return _run(queryset, lambda batch: batch.delete()[0], batch_size)
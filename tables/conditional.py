@@ -0,0 +1,64 @@
+"""
+Conditional GET of table data, validated by the schema and data versions of `ModelSchema`.
+
+Both versions are loaded with the schema, so `If-None-Match` is answered with
+304 Not Modified without querying the table. Writes made outside the API do not
+bump the data version and are not noticed. With `TABLES_ROWS_CACHE` the bodies
+of row responses are also kept in that cache, keyed by the versions.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def get_etag(schema):
+    # the primary key tells apart a table dropped and created again with the same name
+    return f'W/"{schema.pk}.{schema.version}.{schema.data_version}"'
+
+
+def get_schema_etag(schema_pk, version):
+    return f'W/"{schema_pk}.{version}"'
+
+
+def get_last_modified(schema):
+    return int(schema.modified_at.timestamp()) if schema.modified_at else None
+
+
+def not_modified_response(request, schema):
+    """Return a 304 response when the client has the current version of the table, else `None`."""
+    return get_conditional_response(request, etag=get_etag(schema), last_modified=get_last_modified(schema))
+
+
+def set_validators(response, schema):
+    response['ETag'] = get_etag(schema)
+    if schema.modified_at:
+        response['Last-Modified'] = http_date(get_last_modified(schema))
+    return response
+
+
+def body_cache_enabled():
+    return bool(getattr(settings, 'TABLES_ROWS_CACHE', None))
+
+
+def _get_cache():
+    return caches[settings.TABLES_ROWS_CACHE] if body_cache_enabled() else None
+
+
+def _cache_key(schema, request, prefix):
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    return f'tables:{prefix}:{schema.pk}:{schema.version}:{schema.data_version}:{query}'
+
+
+def get_cached_body(schema, request, prefix='rows'):
+    cache = _get_cache()
+    return cache.get(_cache_key(schema, request, prefix)) if cache is not None else None
+
+
+def set_cached_body(schema, request, body, prefix='rows'):
+    cache = _get_cache()
+    if cache is not None:
+        # a new version changes the key, old entries just expire
+        cache.set(_cache_key(schema, request, prefix), body, getattr(settings, 'TABLES_ROWS_CACHE_TIMEOUT', 300))
@@ -5,3 +5,4 @@ TABLE_IDENTIFIER_LEN = POSTGRESQL_IDENTIFIER_LEN - len(POSTGRESQL_DYNAMIC_TABLE_
 TABLE_MODEL_IDENTIFIER_REGEX = rf'^[a-zA-Z][\w]{{0,{TABLE_IDENTIFIER_LEN - 1}}}$'
 TABLE_FIELD_IDENTIFIER_REGEX = rf'^[a-z][a-z0-9_]{{0,{TABLE_IDENTIFIER_LEN - 1}}}$'
 TABLE_APP_LABEL = 'tables'
+SCHEMA_CHANGES_CHANNEL = 'tables_schema_changes'
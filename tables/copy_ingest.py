@@ -0,0 +1,143 @@
+"""Bulk load CSV/NDJSON rows into a dynamic table with PostgreSQL `COPY ... FROM STDIN`.
+
+Input lines are parsed, coerced with the dynamic model fields and re-encoded as
+COPY CSV lazily, so memory stays bounded no matter how big the input is.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, models, transaction
+from django.db.utils import DEFAULT_DB_ALIAS
+
+from .exceptions import IngestError
+
+
+def csv_records(lines):
+    """Yield `(line number, record)` of CSV text lines, the first line is the header with column names."""
+    reader = csv.DictReader(lines, restval=None)
+    for record in reader:
+        if None in record:
+            raise IngestError(reader.line_num, ['Row has more values than the header.'])
+        yield reader.line_num, record
+
+
+def ndjson_records(lines):
+    """Yield `(line number, record)` of NDJSON text lines, one JSON object per line."""
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise IngestError(line_num, ['Invalid JSON.'])
+        if not isinstance(record, dict):
+            raise IngestError(line_num, ['Expected a JSON object.'])
+        yield line_num, record
+
+
+INGEST_FORMATS = {
+    'csv': csv_records,
+    'ndjson': ndjson_records,
+}
+
+
+class _IteratorStream:
+    """Read-only file-like object over an iterator of strings, as consumed by `copy_expert`."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = ''
+        # psycopg2 replaces exceptions raised by `read()` with a generic database error
+        self.error = None
+
+    def read(self, size=-1):
+        try:
+            while size < 0 or len(self._buffer) < size:
+                try:
+                    self._buffer += next(self._chunks)
+                except StopIteration:
+                    break
+        except Exception as err:
+            self.error = err
+            raise
+
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class CopyIngest:
+    def __init__(self, model, using=DEFAULT_DB_ALIAS):
+        self.model = model
+        self.using = using
+        self.fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        self.rows = 0
+
+    def copy_sql(self):
+        quote_name = connections[self.using].ops.quote_name
+        columns = ', '.join(quote_name(field.column) for field in self.fields)
+        return f'COPY {quote_name(self.model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+    def coerce(self, field, record):
+        if field.name not in record:
+            return field.get_default() if field.has_default() else None
+
+        value = record[field.name]
+        # CSV has no NULL, an empty value is NULL unless the column is textual
+        if value == '' and not isinstance(field, (models.CharField, models.TextField)):
+            value = None
+        if isinstance(value, str) and isinstance(field, models.BooleanField):
+            value = {'true': True, 'false': False}.get(value.lower(), value)
+        # `clean()` would also reject NULL of nullable but not blank fields, unlike the row serializers
+        if value is None:
+            if not field.null:
+                raise ValidationError(field.error_messages['null'], code='null')
+            return None
+        return field.clean(value, None)
+
+    def encode(self, line_num, record):
+        unknown = record.keys() - {field.name for field in self.fields}
+        if unknown:
+            raise IngestError(line_num, [f"Unknown columns: {', '.join(sorted(unknown))}"])
+
+        values = []
+        for field in self.fields:
+            try:
+                value = self.coerce(field, record)
+            except ValidationError as err:
+                raise IngestError(line_num, {field.name: err.messages})
+
+            # unquoted empty value is NULL in COPY CSV, quoted one is an empty string
+            if value is None:
+                values.append('')
+            elif isinstance(value, bool):
+                values.append('true' if value else 'false')
+            else:
+                values.append('"' + str(value).replace('"', '""') + '"')
+        return ','.join(values) + '\n'
+
+    def _copy_lines(self, records):
+        for line_num, record in records:
+            yield self.encode(line_num, record)
+            self.rows += 1
+
+    def ingest(self, records):
+        """Copy `(line number, record)` pairs into the table in one transaction, return the number of rows.
+
+        A row violating a unique index aborts the whole copy with `IntegrityError`.
+        """
+        self.rows = 0
+        stream = _IteratorStream(self._copy_lines(records))
+        connection = connections[self.using]
+        try:
+            # `copy_expert()` is not wrapped by Django, translate its errors to `django.db` ones, e.g. `IntegrityError`
+            with transaction.atomic(using=self.using), connection.cursor() as cursor, connection.wrap_database_errors:
+                cursor.copy_expert(self.copy_sql(), stream)
+        except DatabaseError as err:
+            if stream.error is not None:
+                raise stream.error from err
+            raise
+        return self.rows
@@ -0,0 +1,104 @@
+"""In-process cache of built dynamic model classes."""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .dynamic_models_editor import ModelRegistry
+
+
+class ModelCache:
+    """
+    Keep the last built model class of every schema, together with the schema
+    version it was built from. The storage is shared by all instances, the same
+    way `ModelRegistry` shares `apps.all_models`.
+
+    At most `TABLES_MODEL_CACHE_SIZE` models are kept, the least recently used
+    one is evicted and unregistered from the app registry, so memory depends on
+    the hot tables rather than on the number of schemas.
+    """
+    _models = OrderedDict()
+    _lock = threading.RLock()
+
+    @staticmethod
+    def max_size():
+        return getattr(settings, 'TABLES_MODEL_CACHE_SIZE', None)
+
+    def get(self, schema_pk, version):
+        with self._lock:
+            try:
+                cached_version, model = self._models[schema_pk]
+            except KeyError:
+                return None
+            if cached_version == version:
+                self._models.move_to_end(schema_pk)
+                return model
+            return None
+
+    def set(self, schema_pk, version, model):
+        with self._lock:
+            self._models[schema_pk] = (version, model)
+            self._models.move_to_end(schema_pk)
+            max_size = self.max_size()
+            while max_size is not None and len(self._models) > max_size:
+                _, (_, evicted) = self._models.popitem(last=False)
+                ModelRegistry().unregister_model_class(evicted)
+
+    def invalidate(self, schema_pk, version):
+        """Evict the cached model if it was built from a version older than `version`."""
+        with self._lock:
+            try:
+                cached_version, model = self._models[schema_pk]
+            except KeyError:
+                return None
+            if cached_version < version:
+                self.evict(schema_pk)
+                return model
+            return None
+
+    def evict(self, schema_pk):
+        with self._lock:
+            self._models.pop(schema_pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+
+class SchemaDescriptionCache:
+    """
+    Keep the descriptions of `GET /table/<name>` by table name, together with the
+    schema primary key and version they were built from, and the time they were built.
+    The storage is shared by all instances, like the one of `ModelCache`.
+    """
+    _descriptions = {}
+    _lock = threading.Lock()
+
+    def get(self, name):
+        """Return `(schema_pk, version, built_at, description)`, or `None`."""
+        with self._lock:
+            return self._descriptions.get(name)
+
+    def set(self, name, schema_pk, version, built_at, description):
+        with self._lock:
+            self._descriptions[name] = (schema_pk, version, built_at, description)
+
+    def invalidate(self, schema_pk, version):
+        """Evict the description of the schema if it was built from a version older than `version`."""
+        with self._lock:
+            for name, (cached_pk, cached_version, _, _) in list(self._descriptions.items()):
+                if cached_pk == schema_pk and cached_version < version:
+                    del self._descriptions[name]
+
+    def evict(self, schema_pk):
+        with self._lock:
+            for name, (cached_pk, _, _, _) in list(self._descriptions.items()):
+                if cached_pk == schema_pk:
+                    del self._descriptions[name]
+
+    def clear(self):
+        with self._lock:
+            self._descriptions.clear()
@@ -1,9 +1,80 @@
 """Wrapper functions for performing runtime schema changes."""
+import re
+
 from django.apps import apps
 from django.db import connections
 from django.db.utils import DEFAULT_DB_ALIAS
 
 from .constants import TABLE_APP_LABEL
+from .metrics import timed
+from .partitioning import get_partitioning
+
+
+class AlterTableBatchMixin:
+    """
+    Collapse consecutive `ADD COLUMN`/`DROP COLUMN` statements of a table into a single
+    `ALTER TABLE`, so the table is locked and rewritten once. Mixed into the schema
+    editor class of the connection, see `batch_schema_editor()`.
+    """
+    _add_drop_column_re = re.compile(r'^ALTER TABLE (?P<table>"[^"]+") (?P<action>(?:ADD|DROP) COLUMN "(?P<column>[^"]+)".*)$', re.S)
+    _drop_default_re = re.compile(r'^ALTER TABLE (?P<table>"[^"]+") (?P<action>ALTER COLUMN "(?P<column>[^"]+)" DROP DEFAULT)$')
+
+    def __enter__(self):
+        self._pending_table = None
+        self._pending_actions = []
+        self._pending_params = []
+        self._added_columns = set()
+        # defaults of added columns can be dropped only once the columns exist
+        self._pending_drop_defaults = []
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            try:
+                self.flush()
+            except Exception as err:
+                # leave the atomic block of the schema editor before propagating
+                super().__exit__(type(err), err, err.__traceback__)
+                raise
+        return super().__exit__(exc_type, exc_value, traceback)
+
+    def execute(self, sql, params=()):
+        sql = str(sql)
+        if params is not None and not self.collect_sql:
+            match = self._add_drop_column_re.match(sql)
+            if match and self._pending_table in (None, match['table']):
+                self._pending_table = match['table']
+                self._pending_actions.append(match['action'])
+                self._pending_params.extend(params)
+                if match['action'].startswith('ADD'):
+                    self._added_columns.add(match['column'])
+                return
+
+            match = self._drop_default_re.match(sql)
+            if match and match['table'] == self._pending_table and match['column'] in self._added_columns:
+                self._pending_drop_defaults.append(match['action'])
+                return
+
+        self.flush()
+        super().execute(sql, params)
+
+    def flush(self):
+        if not self._pending_actions:
+            return
+        table = self._pending_table
+        actions, params, drop_defaults = self._pending_actions, self._pending_params, self._pending_drop_defaults
+        self._pending_table, self._pending_actions, self._pending_params = None, [], []
+        self._added_columns, self._pending_drop_defaults = set(), []
+
+        super().execute(f'ALTER TABLE {table} {", ".join(actions)}', params)
+        if drop_defaults:
+            super().execute(f'ALTER TABLE {table} {", ".join(drop_defaults)}', ())
+
+
+def batch_schema_editor(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    editor_class = type('BatchSchemaEditor', (AlterTableBatchMixin, connection.SchemaEditorClass), {})
+    return editor_class(connection)
 
 
 class ModelSchemaEditor:
@@ -17,16 +88,105 @@ class ModelSchemaEditor:
             self.create_table(new_model)
         self.initial_model = new_model
 
+    @timed('ddl')
     def create_table(self, new_model):
+        partitioning = get_partitioning(new_model)
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
-            editor.create_model(new_model)
+            if partitioning is not None:
+                partitioning.create_table(editor)
+            else:
+                editor.create_model(new_model)
 
+    @timed('ddl')
     def alter_table(self, new_model):
         old_name = self.initial_model._meta.db_table
         new_name = new_model._meta.db_table
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
-            editor.alter_db_table(new_model, old_name, new_name)
+            self.rename_table(editor, new_model, old_name, new_name)
+
+    @staticmethod
+    def rename_table(editor, new_model, old_name, new_name):
+        editor.alter_db_table(new_model, old_name, new_name)
+        # the sequence and the partitions of a partitioned table are named after it
+        partitioning = get_partitioning(new_model)
+        if partitioning is not None:
+            partitioning.rename(editor, old_name)
+
+    @timed('ddl')
+    def update_table_and_columns(self, new_model, removed_fields=(), altered_fields=(), added_fields=(),
+                                 rewrites=(), concurrent_indexes=False):
+        """
+        Apply a table rename, all column changes and index changes in a single schema editor
+        transaction. `altered_fields` are `(old field, new field)` pairs, indexes are matched by name.
+        `rewrites` are prepared `ColumnRewrite`s swapped in instead of altering the columns.
+        With `concurrent_indexes` the (non unique) indexes are left for
+        `drop_indexes_concurrently()`/`create_indexes_concurrently()`.
+        """
+        old_indexes, new_indexes = self.get_index_changes(new_model)
+        old_constraints = {constraint.name: constraint for constraint in self.initial_model._meta.constraints}
+        new_constraints = {constraint.name: constraint for constraint in new_model._meta.constraints}
+
+        with batch_schema_editor() as editor:
+            old_name = self.initial_model._meta.db_table
+            new_name = new_model._meta.db_table
+            if old_name != new_name:
+                self.rename_table(editor, new_model, old_name, new_name)
+            # indexes are dropped before their columns, which would drop them implicitly
+            if not concurrent_indexes:
+                for index in old_indexes:
+                    editor.remove_index(new_model, index)
+            for name in old_constraints.keys() - new_constraints.keys():
+                editor.remove_constraint(new_model, old_constraints[name])
+            for field in removed_fields:
+                editor.remove_field(new_model, field)
+            for field in added_fields:
+                editor.add_field(new_model, field)
+            # column alterations introspect the table, drops and adds have to be executed first
+            editor.flush()
+            for old_field, new_field in altered_fields:
+                editor.alter_field(new_model, old_field, new_field)
+            for rewrite in rewrites:
+                rewrite.swap(editor, new_model)
+            if not concurrent_indexes:
+                for index in new_indexes:
+                    editor.add_index(new_model, index)
+            for name in new_constraints.keys() - old_constraints.keys():
+                editor.add_constraint(new_model, new_constraints[name])
+        self.initial_model = new_model
 
+    def get_index_changes(self, new_model):
+        """Return indexes of the initial model missing in `new_model` and the new ones, matched by name."""
+        old_indexes = {index.name: index for index in self.initial_model._meta.indexes}
+        new_indexes = {index.name: index for index in new_model._meta.indexes}
+        return (
+            [index for name, index in old_indexes.items() if name not in new_indexes],
+            [index for name, index in new_indexes.items() if name not in old_indexes],
+        )
+
+    @timed('ddl')
+    def drop_indexes_concurrently(self, model, indexes):
+        connection = connections[DEFAULT_DB_ALIAS]
+        # concurrent index operations cannot run inside a transaction nor on partitioned tables
+        concurrently = not connection.in_atomic_block and get_partitioning(model) is None
+        with connection.schema_editor(atomic=False) as editor:
+            for index in indexes:
+                editor.remove_index(model, index, concurrently=concurrently)
+
+    @timed('ddl')
+    def create_indexes_concurrently(self, model, indexes):
+        connection = connections[DEFAULT_DB_ALIAS]
+        concurrently = not connection.in_atomic_block and get_partitioning(model) is None
+        with connection.schema_editor(atomic=False) as editor:
+            for index in indexes:
+                try:
+                    editor.add_index(model, index, concurrently=concurrently)
+                except Exception:
+                    # a failed concurrent build leaves an invalid index behind
+                    if concurrently:
+                        editor.remove_index(model, index, concurrently=True)
+                    raise
+
+    @timed('ddl')
     def drop_table(self, model):
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
             editor.delete_model(model)
@@ -43,14 +203,17 @@ class FieldSchemaEditor:
             self.add_column(model, new_field)
         self.initial_field = new_field
 
+    @timed('ddl')
     def add_column(self, model, field):
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
             editor.add_field(model, field)
 
+    @timed('ddl')
     def alter_column(self, model, new_field):
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
             editor.alter_field(model, self.initial_field, new_field)
 
+    @timed('ddl')
     def drop_column(self, model, field):
         with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
             editor.remove_field(model, field)
@@ -72,3 +235,10 @@ class ModelRegistry:
             del apps.all_models[TABLE_APP_LABEL][model_name]
         except KeyError as err:
             raise LookupError("'{}' not found.".format(model_name)) from err
+        # `get_models()` and relation caches of `_meta` still reference the class
+        apps.clear_cache()
+
+    def unregister_model_class(self, model):
+        """Unregister `model` unless another class was registered under its name since."""
+        if self.get_model(model._meta.model_name) is model:
+            self.unregister_model(model._meta.model_name)
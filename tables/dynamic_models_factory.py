@@ -1,16 +1,19 @@
-import importlib
-
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, HashIndex
 from django.db import models
 
 from .constants import TABLE_APP_LABEL
 from .exceptions import UnsavedSchemaError
+from .field_types import field_types
 from .dynamic_models_editor import ModelRegistry
+from .dynamic_models_cache import ModelCache
+from . import metrics
 
 
 class ModelFactory:
     def __init__(self, model_schema):
         self.schema = model_schema
         self.registry = ModelRegistry()
+        self.cache = ModelCache()
 
     def get_model(self):
         if not self.schema.pk:
@@ -19,10 +22,27 @@ class ModelFactory:
                 " because it has not been saved to the database"
             )
 
-        self.unregister_model()
-        return type(self.schema.name, (models.Model,), self.get_properties())
+        model = self.get_cached_model()
+        if model is not None:
+            metrics.increment('model_cache', result='hit')
+            return model
+
+        metrics.increment('model_cache', result='miss')
+        with metrics.timer('model_build'):
+            self.unregister_model()
+            model = type(self.schema.name, (models.Model,), self.get_properties())
+        self.cache.set(self.schema.pk, self.schema.version, model)
+        return model
+
+    def get_cached_model(self):
+        model = self.cache.get(self.schema.pk, self.schema.version)
+        # the cached class is only valid while it is the one registered under the schema name
+        if model is not None and self.registry.get_model(self.schema.model_name) is model:
+            return model
+        return None
 
     def destroy_model(self):
+        self.cache.evict(self.schema.pk)
         registered_model = self.get_registered_model()
         if registered_model is not None:
             self.unregister_model()
@@ -37,15 +57,18 @@ class ModelFactory:
             pass
 
     def get_properties(self):
+        fields = self._custom_fields()
         return {
-            **self._base_properties(),
-            **self._custom_fields(),
+            **self._base_properties(fields),
+            **fields,
         }
 
-    def _base_properties(self):
+    def _base_properties(self, fields):
         return {
             "__module__": "{}.models".format(TABLE_APP_LABEL),
-            "Meta": self._model_meta(),
+            "Meta": self._model_meta(fields),
+            # field names cannot start with an underscore
+            "_partitioning": self.schema.partitioning,
         }
 
     def _custom_fields(self):
@@ -53,11 +76,20 @@ class ModelFactory:
             field.db_column: FieldFactory(field).make_field() for field in self.schema.fields.all()
         }
 
-    def _model_meta(self):
+    def _model_meta(self, fields):
+        # columns dropped outside of the table API take their indexes with them
+        column_names = {'id', *fields}
+        index_factories = [
+            IndexFactory(definition) for definition in self.schema.indexes
+            if IndexFactory(definition).column_names() <= column_names
+        ]
+
         class Meta:
             app_label = TABLE_APP_LABEL
             db_table = self.schema.table_name
             verbose_name = self.schema.name
+            indexes = [factory.make_index() for factory in index_factories if not factory.is_unique]
+            constraints = [factory.make_index() for factory in index_factories if factory.is_unique]
 
         return Meta
 
@@ -67,11 +99,47 @@ class FieldFactory:
         self.schema = field_schema
 
     def make_field(self):
-        options = self.schema.get_options()
-        field_class = self.get_field_class()
-        return field_class(**options)
+        return self.get_field_type().make_field(self.schema.get_options())
+
+    def get_field_type(self):
+        return field_types.get_by_class_name(self.schema.class_name)
 
     def get_field_class(self):
-        module_name, class_name = self.schema.class_name.rsplit(".", maxsplit=1)
-        module = importlib.import_module(module_name)
-        return getattr(module, class_name)
+        return self.get_field_type().field_class
+
+
+class IndexFactory:
+    """Build an index, or a unique constraint, from an index definition of `ModelSchema.indexes`."""
+    INDEX_CLASSES = {
+        'btree': models.Index,
+        'hash': HashIndex,
+        'gin': GinIndex,
+        'brin': BrinIndex,
+    }
+
+    def __init__(self, definition):
+        self.definition = definition
+
+    @property
+    def is_unique(self):
+        return self.definition.get('unique', False)
+
+    def column_names(self):
+        where_columns = {lookup.split('__')[0] for lookup in self.definition.get('where', {})}
+        return {*self.definition['columns'], *where_columns}
+
+    def get_condition(self):
+        where = self.definition.get('where')
+        return models.Q(**where) if where else None
+
+    def make_index(self):
+        options = {
+            'fields': self.definition['columns'],
+            'name': self.definition['name'],
+            'condition': self.get_condition(),
+        }
+        if self.definition.get('opclasses'):
+            options['opclasses'] = self.definition['opclasses']
+        if self.is_unique:
+            return models.UniqueConstraint(**options)
+        return self.INDEX_CLASSES[self.definition.get('method', 'btree')](**options)
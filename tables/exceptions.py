@@ -21,3 +21,20 @@ class UnsavedSchemaError(DynamicModelError):
     Raised when a model schema has not been saved to the db and a dynamic model
     is attempted to be created.
     """
+
+
+class IngestError(DynamicModelError):
+    """Raised when a row of an ingested CSV/NDJSON body cannot be coerced to the table columns."""
+
+    def __init__(self, line, errors):
+        super().__init__(f"Line {line}: {errors}")
+        self.line = line
+        self.errors = errors
+
+
+class UnknownFieldTypeError(DynamicModelError):
+    """Raised when a field type or field class is not in the field type registry."""
+
+
+class PartitioningError(DynamicModelError):
+    """Raised when a change is incompatible with the partitioning of a table."""
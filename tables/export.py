@@ -0,0 +1,28 @@
+"""Streaming encoders of exported table rows."""
+import csv
+import json
+
+
+class _Echo:
+    """File-like object returning what is written, lets `csv.writer` produce lines one by one."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(field_names, rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def csv_lines(field_names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(field_names)
+    for row in rows:
+        yield writer.writerow([row[name] for name in field_names])
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+    'csv': ('text/csv', csv_lines),
+}
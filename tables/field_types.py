@@ -0,0 +1,59 @@
+"""
+Field types available to dynamic tables.
+
+`FieldSchema.class_name` stores the dotted path of the field class, resolved
+through the registry instead of importing it, so only registered classes can
+ever be instantiated.
+"""
+from types import MappingProxyType
+
+from django.db import models
+
+from .exceptions import UnknownFieldTypeError
+
+
+class FieldType:
+    def __init__(self, key, class_name, field_class, default_options=None):
+        self.key = key
+        self.class_name = class_name
+        self.field_class = field_class
+        # merged under the options stored in `FieldSchema.kwargs`
+        self.default_options = MappingProxyType(default_options or {})
+
+    def make_field(self, options):
+        return self.field_class(**{**self.default_options, **options})
+
+
+class FieldTypeRegistry:
+    def __init__(self):
+        self._by_key = {}
+        self._by_class_name = {}
+
+    def register(self, key, class_name, field_class, default_options=None):
+        field_type = FieldType(key, class_name, field_class, default_options)
+        self._by_key[key] = field_type
+        self._by_class_name[class_name] = field_type
+        return field_type
+
+    def keys(self):
+        return list(self._by_key)
+
+    def get(self, key):
+        try:
+            return self._by_key[key]
+        except KeyError:
+            raise UnknownFieldTypeError(f"Unknown field type: {key}") from None
+
+    def get_by_class_name(self, class_name):
+        try:
+            return self._by_class_name[class_name]
+        except KeyError:
+            raise UnknownFieldTypeError(f"Unknown field class: {class_name}") from None
+
+
+field_types = FieldTypeRegistry()
+field_types.register('string', 'django.db.models.TextField', models.TextField)
+field_types.register('number', 'django.db.models.FloatField', models.FloatField)
+field_types.register('boolean', 'django.db.models.BooleanField', models.BooleanField)
+field_types.register('integer', 'django.db.models.IntegerField', models.IntegerField)
+field_types.register('datetime', 'django.db.models.DateTimeField', models.DateTimeField)
@@ -0,0 +1,70 @@
+"""
+Row filters given as query parameters, `?where.<column>[__<lookup>]=<value>`.
+
+The prefix keeps filters apart from the other parameters, columns may be named
+`limit` or `sum`. Values are converted by the model field of the column.
+"""
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.db.models import Q
+
+FILTER_PREFIX = 'where.'
+TEXT_LOOKUPS = {'contains', 'icontains', 'startswith', 'istartswith'}
+LOOKUPS = {'exact', 'gt', 'gte', 'lt', 'lte', 'in', 'isnull', *TEXT_LOOKUPS}
+BOOLEAN_VALUES = {'true': True, 'false': False}
+
+
+class InvalidFilterError(ValueError):
+    """Raised with `errors`, messages by query parameter, when filters cannot be parsed."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def coerce_value(field, value):
+    if isinstance(field, models.BooleanField):
+        value = BOOLEAN_VALUES.get(value.lower(), value)
+    return field.to_python(value)
+
+
+def parse_filter(model, lookup, value):
+    column, _, lookup_name = lookup.partition('__')
+    lookup_name = lookup_name or 'exact'
+    try:
+        field = model._meta.get_field(column)
+    except FieldDoesNotExist:
+        raise ValueError(f'Unknown column: {column}')
+    if lookup_name not in LOOKUPS:
+        raise ValueError(f'Unsupported lookup: {lookup_name}')
+    if lookup_name in TEXT_LOOKUPS and not isinstance(field, (models.CharField, models.TextField)):
+        raise ValueError(f'Lookup {lookup_name} is supported only by text columns.')
+
+    try:
+        if lookup_name == 'isnull':
+            if value.lower() not in BOOLEAN_VALUES:
+                raise ValueError('Expected true or false.')
+            value = BOOLEAN_VALUES[value.lower()]
+        elif lookup_name == 'in':
+            value = [coerce_value(field, item) for item in value.split(',')]
+        else:
+            value = coerce_value(field, value)
+    except ValidationError as err:
+        raise ValueError(' '.join(err.messages))
+    return Q(**{f'{column}__{lookup_name}': value})
+
+
+def parse_filters(model, query_params):
+    """Return a `Q` of all `where.` parameters joined with AND."""
+    condition = Q()
+    errors = {}
+    for param, value in query_params.items():
+        if not param.startswith(FILTER_PREFIX):
+            continue
+        try:
+            condition &= parse_filter(model, param[len(FILTER_PREFIX):], value)
+        except ValueError as err:
+            errors[param] = [str(err)]
+    if errors:
+        raise InvalidFilterError(errors)
+    return condition
@@ -0,0 +1,60 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tables.benchmark import run_benchmarks
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark model builds, DDL, inserts and fetches of dynamic tables of various sizes and print '
+        'the results as JSON. Run against a disposable database with DEBUG disabled.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--columns', type=int_list, default=[5, 50, 500], help='Comma separated column counts.')
+        parser.add_argument('--rows', type=int_list, default=[10_000, 1_000_000], help='Comma separated row counts.')
+        parser.add_argument('--samples', type=int, default=100, help='Measurements per operation.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert request.')
+        parser.add_argument('--host', default='localhost', help='Host header of the API requests.')
+        parser.add_argument('--output', help='Write the results to a file instead of the standard output.')
+
+    def handle(self, *args, columns, rows, samples, batch_size, host, output, **options):
+        try:
+            benchmarks = run_benchmarks(columns, rows, samples=samples, batch_size=batch_size, host=host)
+        except ValueError as err:
+            raise CommandError(str(err))
+
+        results = {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': self.get_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'postgresql': connection.pg_version,
+            'benchmarks': benchmarks,
+        }
+
+        report = json.dumps(results, indent=2)
+        if output:
+            with open(output, 'w') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
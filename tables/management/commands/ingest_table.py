@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from tables.copy_ingest import INGEST_FORMATS, CopyIngest
+from tables.exceptions import IngestError
+from tables.models import ModelSchema
+
+
+class Command(BaseCommand):
+    help = 'Load a CSV (with a header line) or NDJSON file into a dynamic table using PostgreSQL COPY.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table_name')
+        parser.add_argument('path', help="Input file, '-' reads the standard input.")
+        parser.add_argument('--format', choices=sorted(INGEST_FORMATS), help='Defaults to the file extension.')
+
+    def handle(self, *args, table_name, path, format, **options):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            raise CommandError(f"Table '{table_name}' does not exist")
+
+        input_format = format or Path(path).suffix.lstrip('.').lower()
+        if input_format not in INGEST_FORMATS:
+            raise CommandError('Cannot guess the input format, use --format')
+
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            rows = CopyIngest(schema.as_model()).ingest(INGEST_FORMATS[input_format](source))
+        except IngestError as err:
+            raise CommandError(str(err))
+        except IntegrityError as err:
+            raise CommandError(f'Row violates a unique index of the table. {err}')
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        schema.bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Loaded {rows} rows into {schema.table_name}'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from tables.models import ModelSchema
+from tables.partitioning import get_partitioning
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming range partitions and drop partitions past their retention, run it periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table_names', nargs='*', help='Tables to maintain, all partitioned tables by default.')
+
+    def handle(self, *args, table_names, **options):
+        schemas = ModelSchema.objects.filter(partitioning__method='range')
+        if table_names:
+            schemas = schemas.filter(name__in=table_names)
+            missing = set(table_names) - {schema.name for schema in schemas}
+            if missing:
+                raise CommandError(f"Not range partitioned tables: {', '.join(sorted(missing))}")
+
+        failed = []
+        for schema in schemas:
+            try:
+                created, dropped = get_partitioning(schema.as_model()).maintain()
+            except DatabaseError as err:
+                # the changes of a table are one transaction, the other tables are still maintained
+                self.stderr.write(f'{schema.name}: failed, {err}')
+                failed.append(schema.name)
+                continue
+            if dropped:
+                # the rows of dropped partitions are gone, responses of the previous version are stale
+                schema.bump_data_version()
+            for name in created:
+                self.stdout.write(f'{schema.name}: created {name}')
+            for name in dropped:
+                self.stdout.write(f'{schema.name}: dropped {name}')
+        if failed:
+            raise CommandError(f"Failed to maintain: {', '.join(failed)}")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tables.schema_jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Apply table updates queued by the API, polling for new jobs until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue polls.')
+
+    def handle(self, *args, once, poll_interval, **options):
+        try:
+            while True:
+                count = run_pending_jobs()
+                if count:
+                    self.stdout.write(f'Ran {count} schema change jobs')
+                if once:
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
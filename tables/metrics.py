@@ -0,0 +1,216 @@
+"""
+In-process timers and counters of the hot paths, enabled with `TABLES_METRICS`.
+
+Metrics are exposed in the Prometheus text format on `/metrics`, every worker
+process reports its own. With `TABLES_METRICS_SERVER_TIMING` the timings of a
+request are also returned in its `Server-Timing` header, see `ServerTimingMiddleware`.
+"""
+import asyncio
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+# timings of the current request, `None` outside `ServerTimingMiddleware`
+_request_timings = ContextVar('tables_request_timings', default=None)
+_disabled_timer = nullcontext()
+
+
+def metrics_enabled():
+    return getattr(settings, 'TABLES_METRICS', False)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        # (name, labels) -> [sum of seconds, count]
+        self._summaries = defaultdict(lambda: [0.0, 0])
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            summary = self._summaries[self._key(name, labels)]
+            summary[0] += seconds
+            summary[1] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted((key, tuple(value)) for key, value in self._summaries.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f'tables_{name}_total'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{self._format_labels(labels)} {value:g}')
+        for (name, labels), (total, count) in summaries:
+            metric = f'tables_{name}_seconds'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} summary')
+            lines.append(f'{metric}_sum{self._format_labels(labels)} {total:.9f}')
+            lines.append(f'{metric}_count{self._format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class _Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        registry.observe(self.name, duration, **self.labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0) + duration
+
+
+def timer(name, **labels):
+    """Time a block as `tables_<name>_seconds`, a no-op context manager when metrics are disabled."""
+    if not metrics_enabled():
+        return _disabled_timer
+    return _Timer(name, labels)
+
+
+def increment(name, value=1, **labels):
+    if metrics_enabled():
+        registry.increment(name, value, **labels)
+
+
+def timed(name):
+    """Decorate a method to time it as `tables_<name>_seconds{operation="<method name>"}`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, operation=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def instrument_view(method):
+    """Time a `(self, request, table_name)` view method and count its SQL queries per table.
+
+    The table name comes from the URL, it is only used as a label once the view found
+    the table, so requests of unknown tables (404) cannot add new series.
+    """
+    @functools.wraps(method)
+    def wrapper(view, request, table_name, *args, **kwargs):
+        if not metrics_enabled():
+            return method(view, request, table_name, *args, **kwargs)
+
+        queries = _QueryCounter()
+        with timer('view', view=type(view).__name__, method=request.method), connection.execute_wrapper(queries):
+            response = method(view, request, table_name, *args, **kwargs)
+        if response.status_code != 404:
+            registry.increment('queries', queries.count, table=table_name)
+            registry.observe('sql', queries.duration, table=table_name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings['sql'] = timings.get('sql', 0) + queries.duration
+        return response
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """Add the timings of the request to the `Server-Timing` header, with `TABLES_METRICS_SERVER_TIMING`."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # async views are served without switching to a thread
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def is_enabled():
+        return metrics_enabled() and getattr(settings, 'TABLES_METRICS_SERVER_TIMING', False)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.is_enabled():
+            return self.get_response(request)
+
+        timings = {}
+        token = _request_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.add_header(response, timings)
+
+    async def __acall__(self, request):
+        if not self.is_enabled():
+            return await self.get_response(request)
+
+        timings = {}
+        token = _request_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.add_header(response, timings)
+
+    @staticmethod
+    def add_header(response, timings):
+        if timings:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration * 1000:.3f}' for name, duration in timings.items()
+            )
+        return response
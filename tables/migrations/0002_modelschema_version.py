@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelschema',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0002_modelschema_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelschema',
+            name='indexes',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 06:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0003_modelschema_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaChangeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('succeeded', 'succeeded'), ('failed', 'failed')], db_index=True, default='pending', max_length=16)),
+                ('progress', models.FloatField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('model_schema', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='tables.modelschema')),
+            ],
+        ),
+    ]
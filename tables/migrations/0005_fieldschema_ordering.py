@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 06:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0004_schemachangejob'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='fieldschema',
+            options={'ordering': ['id']},
+        ),
+    ]
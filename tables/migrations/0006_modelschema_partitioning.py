@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0005_fieldschema_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelschema',
+            name='partitioning',
+            field=models.JSONField(default=None, null=True),
+        ),
+    ]
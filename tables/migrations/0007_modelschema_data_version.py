@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0006_modelschema_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelschema',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='modelschema',
+            name='modified_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0007_modelschema_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schemachangejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
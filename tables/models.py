@@ -1,18 +1,35 @@
+from contextlib import nullcontext
+
 from django.apps import apps
 from django.core.exceptions import FieldDoesNotExist
-from django.db import models
-from django.db.models import UniqueConstraint
-from django.db.models.functions import Lower
+from django.db import connection, models, transaction
+from django.db.models import F, UniqueConstraint
+from django.db.models.functions import Lower, Now
 from django.utils.text import slugify
 
 from .exceptions import InvalidFieldNameError, NullFieldChangedError
-from .dynamic_models_factory import ModelFactory
+from .field_types import field_types
+from .dynamic_models_cache import SchemaDescriptionCache
+from .dynamic_models_factory import FieldFactory, ModelFactory
 from .dynamic_models_editor import FieldSchemaEditor, ModelSchemaEditor, ModelRegistry
 from .constants import POSTGRESQL_IDENTIFIER_LEN, POSTGRESQL_DYNAMIC_TABLE_PREFIX
+from .online_schema import ColumnRewrite, lock_timeout, online_schema_changes_enabled, retry_on_lock_timeout
+from .schema_events import publish_schema_change
+from . import metrics
 
 
 class ModelSchema(models.Model):
     name = models.CharField(max_length=POSTGRESQL_IDENTIFIER_LEN, unique=True)
+    # bumped on every schema change, built model classes are cached per version
+    version = models.PositiveBigIntegerField(default=0)
+    # index definitions, see `IndexSerializer`
+    indexes = models.JSONField(default=list)
+    # partitioning of the table, see `tables.partitioning`, fixed once the table is created
+    partitioning = models.JSONField(null=True, default=None)
+    # bumped by row writes through the API, together with `version` it identifies the table contents
+    data_version = models.PositiveBigIntegerField(default=0)
+    # time of the last schema change or row write
+    modified_at = models.DateTimeField(null=True)
 
     class Meta:
         constraints = [
@@ -26,22 +43,149 @@ class ModelSchema(models.Model):
         super().__init__(*args, **kwargs)
         self._registry = ModelRegistry()
         self._initial_name = self.name
-        initial_model = self.get_registered_model()
-        self._schema_editor = ModelSchemaEditor(initial_model=initial_model)
+        # created on first use, loading schemas must stay cheap
+        self._editor = None
+
+    @property
+    def _schema_editor(self):
+        if self._editor is None:
+            self._editor = ModelSchemaEditor(initial_model=self._registry.get_model(self.initial_model_name))
+        return self._editor
 
     def save(self, **kwargs):
+        # resolve the initial model before the new one replaces it in the registry
+        schema_editor = self._schema_editor
         super().save(**kwargs)
-        self._schema_editor.update_table(self._factory.get_model())
+        self.bump_version()
+        schema_editor.update_table(self._factory.get_model())
+        self._initial_name = self.name
+
+    def create_with_fields(self, fields, indexes=()):
+        """Save a new schema with its fields and create the table with all its columns and indexes at once."""
+        for field in fields:
+            field.validate()
+
+        with transaction.atomic():
+            self.indexes = list(indexes)
+            super().save()
+            for field in fields:
+                field.model_schema = self
+            FieldSchema.objects.bulk_create(fields)
+            self.bump_version()
+            self._schema_editor.create_table(self.as_model())
+        self._initial_name = self.name
+
+    def apply_changes(self, name, removed_fields=(), updated_fields=(), created_fields=(), indexes=None,
+                      progress=None):
+        """
+        Rename the schema and save all its field and index changes, then apply their DDL in a
+        single schema editor transaction instead of one per `save()`/`delete()`.
+        `indexes` replaces all index definitions, `None` keeps them.
+
+        With online schema changes enabled, column type changes are backfilled before the
+        transaction (reporting `progress` from 0 to 1) and indexes are built concurrently.
+        """
+        if indexes is None:
+            indexes = self.indexes
+        if (name == self.name and indexes == self.indexes
+                and not (removed_fields or updated_fields or created_fields)):
+            return
+
+        for field in [*updated_fields, *created_fields]:
+            field.validate()
+
+        old_model = self.as_model()
+        online = online_schema_changes_enabled()
+        rewrites = []
+        if online:
+            for field in updated_fields:
+                old_field = old_model._meta.get_field(field.db_column)
+                new_field = FieldFactory(field).make_field()
+                if ColumnRewrite.needs_rewrite(old_field, new_field):
+                    rewrites.append(ColumnRewrite(old_model, old_field, new_field.db_type(connection)))
+
+        try:
+            for rewrite in rewrites:
+                rewrite.prepare()
+                rewrite.backfill(progress=progress)
+            new_model = retry_on_lock_timeout(lambda: self._apply_changes_in_transaction(
+                old_model, name, removed_fields, updated_fields, created_fields, indexes, rewrites, online
+            ))
+        except Exception:
+            for rewrite in rewrites:
+                rewrite.abort()
+            raise
         self._initial_name = self.name
 
+        if online:
+            # dropped once the change is committed, a failed change keeps the indexes it declares
+            new_index_names = {index.name for index in new_model._meta.indexes}
+            self._schema_editor.drop_indexes_concurrently(
+                old_model, [index for index in old_model._meta.indexes if index.name not in new_index_names]
+            )
+            old_index_names = {index.name for index in old_model._meta.indexes}
+            rebuilt = [index for rewrite in rewrites for index in rewrite.dropped_indexes(new_model)]
+            self._schema_editor.create_indexes_concurrently(new_model, [
+                *(index for index in new_model._meta.indexes if index.name not in old_index_names),
+                *{index.name: index for index in rebuilt}.values(),
+            ])
+
+    def _apply_changes_in_transaction(self, old_model, name, removed_fields, updated_fields, created_fields,
+                                      indexes, rewrites, online):
+        rewritten_columns = {rewrite.column for rewrite in rewrites}
+        with transaction.atomic(), (lock_timeout() if online else nullcontext()):
+            self.name = name
+            self.indexes = indexes
+            super().save(update_fields=['name', 'indexes'])
+            FieldSchema.objects.filter(pk__in=[field.pk for field in removed_fields]).delete()
+            FieldSchema.objects.bulk_update(updated_fields, ['class_name', 'kwargs'])
+            FieldSchema.objects.bulk_create(created_fields)
+            self.bump_version()
+
+            new_model = self._factory.get_model()
+            self._schema_editor.initial_model = old_model
+            self._schema_editor.update_table_and_columns(
+                new_model,
+                removed_fields=[old_model._meta.get_field(field.db_column) for field in removed_fields],
+                altered_fields=[
+                    (old_model._meta.get_field(field.db_column), new_model._meta.get_field(field.db_column))
+                    for field in updated_fields if field.db_column not in rewritten_columns
+                ],
+                added_fields=[new_model._meta.get_field(field.db_column) for field in created_fields],
+                rewrites=rewrites,
+                concurrent_indexes=online,
+            )
+        return new_model
+
     def delete(self, **kwargs):
         self._schema_editor.drop_table(self.as_model())
         self._factory.destroy_model()
+        SchemaDescriptionCache().evict(self.pk)
+        # other workers drop their model and description as if the schema had a new version
+        publish_schema_change(self.pk, self.version + 1)
         super().delete(**kwargs)
 
     def get_registered_model(self):
         return self._registry.get_model(self.model_name)
 
+    def bump_version(self):
+        ModelSchema.objects.filter(pk=self.pk).update(version=F('version') + 1, modified_at=Now())
+        self.version = ModelSchema.objects.values_list('version', flat=True).get(pk=self.pk)
+        SchemaDescriptionCache().evict(self.pk)
+        publish_schema_change(self.pk, self.version)
+
+    def bump_data_version(self):
+        """
+        Mark the rows as changed, call it once the write is committed. Inside the write transaction
+        the lock of the schema row would serialize all writes into the table until the commit.
+        Until the bump, readers may get the new rows with the previous version, and clients with
+        an ETag of that version are answered 304 for that moment.
+        """
+        ModelSchema.objects.filter(pk=self.pk).update(data_version=F('data_version') + 1, modified_at=Now())
+
+    async def abump_data_version(self):
+        await ModelSchema.objects.filter(pk=self.pk).aupdate(data_version=F('data_version') + 1, modified_at=Now())
+
     @property
     def initial_model_name(self):
         return str(self._initial_name).title()
@@ -60,7 +204,8 @@ class ModelSchema(models.Model):
         return f"{POSTGRESQL_DYNAMIC_TABLE_PREFIX}{safe_name}"
 
     def as_model(self):
-        return self._factory.get_model()
+        with metrics.timer('model'):
+            return self._factory.get_model()
 
 
 class FieldSchema(models.Model):
@@ -74,6 +219,8 @@ class FieldSchema(models.Model):
     kwargs = models.JSONField(default=dict)
 
     class Meta:
+        # columns of the built models keep the order they were added in
+        ordering = ['id']
         constraints = [
             models.UniqueConstraint(
                 Lower('name'),
@@ -86,19 +233,29 @@ class FieldSchema(models.Model):
         super().__init__(*args, **kwargs)
         self._initial_name = self.name
         self._initial_null = self.null
-        self._initial_field = self.get_registered_model_field()
-        self._schema_editor = FieldSchemaEditor(initial_field=self._initial_field)
+        # created on first use, the initial field lookup needs `model_schema` which would be a query per instance
+        self._editor = None
+
+    @property
+    def _schema_editor(self):
+        if self._editor is None:
+            self._editor = FieldSchemaEditor(initial_field=self.get_registered_model_field())
+        return self._editor
 
     def save(self, **kwargs):
         self.validate()
+        # resolve the initial field before the model is rebuilt with the new one
+        schema_editor = self._schema_editor
         super().save(**kwargs)
+        self.model_schema.bump_version()
         model, field = self._get_model_with_field()
-        self._schema_editor.update_column(model, field)
+        schema_editor.update_column(model, field)
 
     def delete(self, **kwargs):
         model, field = self._get_model_with_field()
         self._schema_editor.drop_column(model, field)
         super().delete(**kwargs)
+        self.model_schema.bump_version()
 
     def validate(self):
         if self._initial_null and not self.null:
@@ -107,11 +264,16 @@ class FieldSchema(models.Model):
         if '__' in self.name or self.name in self._PROHIBITED_NAMES:
             raise InvalidFieldNameError(f"{self.name} is not a valid field name")
 
+        field_types.get_by_class_name(self.class_name)
+
     def get_registered_model_field(self):
-        latest_model = self.model_schema.get_registered_model()
-        if latest_model and self.name:
+        if self._state.adding:
+            return None
+        # models evicted from the model cache are rebuilt from the saved fields
+        latest_model = self.model_schema.get_registered_model() or self.model_schema.as_model()
+        if latest_model and self._initial_name:
             try:
-                return latest_model._meta.get_field(self.name)
+                return latest_model._meta.get_field(self._initial_name)
             except FieldDoesNotExist:
                 pass
 
@@ -137,3 +299,28 @@ class FieldSchema(models.Model):
         except FieldDoesNotExist:
             field = None
         return model, field
+
+
+class SchemaChangeJob(models.Model):
+    """A table update queued by the API, applied by the `run_schema_jobs` command."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(status, status) for status in (PENDING, RUNNING, SUCCEEDED, FAILED)]
+
+    model_schema = models.ForeignKey(ModelSchema, on_delete=models.CASCADE, related_name="jobs")
+    # validated `TableSerializer` data
+    data = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    progress = models.FloatField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    # touched by the runner while the job is running, see `schema_jobs.fail_stale_jobs()`
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
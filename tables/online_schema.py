@@ -0,0 +1,218 @@
+"""Low-lock ("online") schema changes of busy dynamic tables.
+
+Enabled with `TABLES_ONLINE_SCHEMA_CHANGES`. DDL waits for table locks at most
+`TABLES_DDL_LOCK_TIMEOUT` and is retried with an exponential backoff, indexes are
+built concurrently and column type changes are backfilled in batches instead of
+rewriting the whole table under an exclusive lock.
+
+Adding columns needs no special handling, PostgreSQL 11+ adds columns with a
+constant default without rewriting the table.
+"""
+import hashlib
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.models import Q
+from django.db.utils import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+# https://www.postgresql.org/docs/current/errcodes-appendix.html
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def online_schema_changes_enabled():
+    return getattr(settings, 'TABLES_ONLINE_SCHEMA_CHANGES', False)
+
+
+@contextmanager
+def lock_timeout(using=DEFAULT_DB_ALIAS):
+    """Give up waiting for locks after `TABLES_DDL_LOCK_TIMEOUT`, instead of queueing all other queries behind."""
+    connection = connections[using]
+    timeout = getattr(settings, 'TABLES_DDL_LOCK_TIMEOUT', '2s')
+    # inside a transaction the setting is reverted on commit or rollback
+    is_local = connection.in_atomic_block
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('lock_timeout', %s, %s)", [timeout, is_local])
+    try:
+        yield
+    finally:
+        if not is_local:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET lock_timeout')
+
+
+def retry_on_lock_timeout(func, using=DEFAULT_DB_ALIAS):
+    """Call `func`, retrying with an exponential backoff when it times out waiting for a lock."""
+    # an aborted outer transaction cannot be retried
+    retries = 0 if connections[using].in_atomic_block else getattr(settings, 'TABLES_DDL_LOCK_RETRIES', 5)
+    backoff = getattr(settings, 'TABLES_DDL_LOCK_RETRY_BACKOFF', 0.5)
+    for attempt in itertools.count():
+        try:
+            return func()
+        except OperationalError as err:
+            if attempt >= retries or getattr(err.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE:
+                raise
+            delay = backoff * 2 ** attempt
+            logger.info('Lock timeout, retrying schema change in %.1fs (attempt %d/%d)', delay, attempt + 1, retries)
+            time.sleep(delay)
+
+
+class ColumnRewrite:
+    """
+    Change the type of a column without rewriting the table under an exclusive lock.
+
+    A shadow column of the new type is added and kept in sync by a trigger, existing
+    rows are backfilled in batches of primary keys and finally the shadow column
+    replaces the original one in a short transaction, see `swap()`.
+    """
+
+    def __init__(self, model, old_field, new_db_type, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.table = model._meta.db_table
+        self.pk_column = model._meta.pk.column
+        self.column = old_field.column
+        # field names cannot contain `__`, the shadow column cannot collide with a field
+        self.shadow_column = f'{old_field.column[:58]}__new'
+        self.new_db_type = new_db_type
+        # `DROP COLUMN ... CASCADE` in `swap()` drops the indexes and constraints using the column
+        self.old_index_names = {index.name for index in model._meta.indexes}
+        self.old_constraint_names = {constraint.name for constraint in model._meta.constraints}
+        digest = hashlib.md5(f'{self.table}.{self.column}'.encode()).hexdigest()[:16]
+        self.function_name = f'dt_sync_{digest}'
+        self.trigger_name = f'dt_sync_{digest}'
+
+    @staticmethod
+    def needs_rewrite(old_field, new_field, using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        return old_field.db_type(connection) != new_field.db_type(connection)
+
+    def _quote(self, name):
+        return connections[self.using].ops.quote_name(name)
+
+    def references(self, index):
+        """Whether an index or a constraint uses the column, in its columns or its condition."""
+        def condition_columns(condition):
+            for child in condition.children:
+                if isinstance(child, Q):
+                    yield from condition_columns(child)
+                else:
+                    yield child[0].split('__')[0]
+
+        columns = {name.lstrip('-') for name in index.fields}
+        if index.condition is not None:
+            columns.update(condition_columns(index.condition))
+        return self.column in columns
+
+    def dropped_indexes(self, new_model):
+        """Return the kept indexes of `new_model` dropped by `swap()`, to be built again."""
+        return [
+            index for index in new_model._meta.indexes
+            if index.name in self.old_index_names and self.references(index)
+        ]
+
+    def _cast(self, column):
+        return f'{self._quote(column)}::{self.new_db_type}'
+
+    def prepare(self):
+        table, shadow = self._quote(self.table), self._quote(self.shadow_column)
+
+        def add_shadow_column():
+            with transaction.atomic(using=self.using), lock_timeout(self.using), \
+                    connections[self.using].cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {shadow} {self.new_db_type} NULL')
+                cursor.execute(
+                    f'CREATE FUNCTION {self._quote(self.function_name)}() RETURNS trigger LANGUAGE plpgsql AS $$ '
+                    f'BEGIN NEW.{shadow} := NEW.{self._cast(self.column)}; RETURN NEW; END $$'
+                )
+                cursor.execute(
+                    f'CREATE TRIGGER {self._quote(self.trigger_name)} BEFORE INSERT OR UPDATE ON {table} '
+                    f'FOR EACH ROW EXECUTE FUNCTION {self._quote(self.function_name)}()'
+                )
+
+        retry_on_lock_timeout(add_shadow_column, self.using)
+
+    def _id_ranges(self, batch_size):
+        """Yield `(after, upper)` primary key ranges of up to `batch_size` rows, like `bulk_rows.id_ranges()`."""
+        table, pk = self._quote(self.table), self._quote(self.pk_column)
+        after = None
+        with connections[self.using].cursor() as cursor:
+            while True:
+                where, params = ('', []) if after is None else (f'WHERE {pk} > %s', [after])
+                cursor.execute(
+                    f'SELECT {pk} FROM {table} {where} ORDER BY {pk} OFFSET %s LIMIT 1', [*params, batch_size - 1],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {table} {where})', params)
+                    if cursor.fetchone()[0]:
+                        yield after, None
+                    return
+                yield after, row[0]
+                after = row[0]
+
+    def backfill(self, batch_size=None, progress=None):
+        """Copy existing values to the shadow column, one short transaction per batch of primary keys."""
+        batch_size = batch_size or getattr(settings, 'TABLES_BACKFILL_BATCH_SIZE', 10000)
+        table, pk = self._quote(self.table), self._quote(self.pk_column)
+        connection = connections[self.using]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN({pk}), MAX({pk}) FROM {table}')
+            min_pk, max_pk = cursor.fetchone()
+        if min_pk is None:
+            return
+
+        for after, upper in self._id_ranges(batch_size):
+            conditions, params = [], []
+            if after is not None:
+                conditions.append(f'{pk} > %s')
+                params.append(after)
+            if upper is not None:
+                conditions.append(f'{pk} <= %s')
+                params.append(upper)
+            where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+            with transaction.atomic(using=self.using), connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET {self._quote(self.shadow_column)} = {self._cast(self.column)} {where}',
+                    params,
+                )
+            if progress is not None:
+                # the position in the id range, rows inserted meanwhile are synced by the trigger
+                done = max_pk if upper is None else min(upper, max_pk)
+                progress((done - min_pk + 1) / (max_pk - min_pk + 1))
+
+    def swap(self, editor, new_model):
+        """Replace the original column with the shadow one, called inside the schema editor transaction."""
+        new_field = new_model._meta.get_field(self.column)
+        table = self._quote(new_model._meta.db_table)
+
+        editor.execute(f'DROP TRIGGER {self._quote(self.trigger_name)} ON {table}')
+        editor.execute(f'DROP FUNCTION {self._quote(self.function_name)}()')
+        editor.execute(f'ALTER TABLE {table} DROP COLUMN {self._quote(self.column)} CASCADE')
+        editor.execute(f'ALTER TABLE {table} RENAME COLUMN {self._quote(self.shadow_column)} TO {self._quote(self.column)}')
+
+        # the shadow column is a plain nullable column, let Django add NOT NULL, unique and index
+        shadow_field = new_field.clone()
+        shadow_field.null = True
+        shadow_field.db_index = False
+        shadow_field._unique = False
+        shadow_field.set_attributes_from_name(new_field.name)
+        shadow_field.model = new_model
+        editor.alter_field(new_model, shadow_field, new_field)
+
+        # unique constraints are recreated in the transaction, indexes concurrently after it
+        for constraint in new_model._meta.constraints:
+            if constraint.name in self.old_constraint_names and self.references(constraint):
+                editor.add_constraint(new_model, constraint)
+
+    def abort(self):
+        table = self._quote(self.table)
+        with transaction.atomic(using=self.using), connections[self.using].cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {self._quote(self.trigger_name)} ON {table}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS {self._quote(self.function_name)}()')
+            cursor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS {self._quote(self.shadow_column)}')
@@ -0,0 +1,97 @@
+"""Keyset (cursor) pagination of dynamic table rows.
+
+Pages are selected with `WHERE (column, id) > (last column value, last id)` on an
+indexed column, so a deep page costs the same as the first one, unlike OFFSET.
+"""
+import base64
+import binascii
+import json
+
+from django.db import models
+from django.db.models import Q
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded."""
+
+
+def is_indexed(model, field_name):
+    field = model._meta.get_field(field_name)
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    # partial indexes and non btree indexes cannot serve the ordering of a whole table
+    btree_indexes = [
+        index for index in [*model._meta.indexes, *model._meta.constraints]
+        if type(index) in (models.Index, models.UniqueConstraint)
+    ]
+    return any(
+        index.fields and index.fields[0].lstrip('-') == field_name and index.condition is None
+        for index in btree_indexes
+    )
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError) as err:
+        raise InvalidCursorError('Invalid cursor.') from err
+    if not isinstance(position, dict) or not {'order_by', 'value', 'pk'} <= position.keys():
+        raise InvalidCursorError('Invalid cursor.')
+    return position
+
+
+class KeysetPaginator:
+    def __init__(self, model, order_by='id', limit=100):
+        self.model = model
+        self.order_by = order_by
+        self.field_name = order_by.lstrip('-')
+        self.descending = order_by.startswith('-')
+        self.limit = limit
+        self.pk_name = model._meta.pk.name
+
+    def get_ordering(self):
+        if self.field_name == self.pk_name:
+            return [self.order_by]
+        # the primary key breaks ties of non unique columns
+        return [self.order_by, f'-{self.pk_name}' if self.descending else self.pk_name]
+
+    def get_after_filter(self, position):
+        lookup = 'lt' if self.descending else 'gt'
+        after_pk = Q(**{f'{self.pk_name}__{lookup}': position['pk']})
+        if self.field_name == self.pk_name:
+            return after_pk
+        return Q(**{f'{self.field_name}__{lookup}': position['value']}) | (
+            Q(**{self.field_name: position['value']}) & after_pk
+        )
+
+    def paginate(self, queryset, encoder, after=None):
+        """Return rows of the page and the cursor of the next page, `None` on the last page."""
+        return self.get_page(encoder.encode_rows(self.get_page_queryset(queryset, after)))
+
+    async def apaginate(self, queryset, encoder, after=None):
+        return self.get_page(await encoder.aencode_rows(self.get_page_queryset(queryset, after)))
+
+    def get_page_queryset(self, queryset, after=None):
+        if after is not None:
+            if after['order_by'] != self.order_by:
+                raise InvalidCursorError('Cursor does not match the requested ordering.')
+            queryset = queryset.filter(self.get_after_filter(after))
+        # one extra row tells whether there is a next page
+        return queryset.order_by(*self.get_ordering())[:self.limit + 1]
+
+    def get_page(self, rows):
+        if len(rows) <= self.limit:
+            return rows, None
+
+        rows = rows[:self.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            'order_by': self.order_by,
+            'value': last[self.field_name],
+            'pk': last[self.pk_name],
+        })
+        return rows, next_cursor
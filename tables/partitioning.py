@@ -0,0 +1,247 @@
+"""
+Declarative partitioning of dynamic tables, see `ModelSchema.partitioning`.
+
+A definition is `{"method": "hash", "column": ..., "partitions": N}` or
+`{"method": "range", "column": ..., "interval": ..., "premake": N, "retention": N}`,
+ranges of datetime columns are `day`, `week`, `month` or `year` long, ranges of
+number columns are `interval` wide. Range partitioned tables have a default
+partition and `premake` future partitions, `maintain_partitions` keeps creating
+them and drops partitions older than `retention` intervals. A range with rows
+already in the default partition is skipped, those rows stay there.
+
+PostgreSQL requires the partition column in the primary key of a partitioned
+table and, before version 17, does not support identity columns there, so
+the primary key is `(id, <column>)` and `id` is filled from a sequence.
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+from django.db import connections
+from django.db.utils import DEFAULT_DB_ALIAS
+
+from .constants import POSTGRESQL_IDENTIFIER_LEN
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_UNITS = ('day', 'week', 'month', 'year')
+DEFAULT_PREMAKE = 4
+_bound_re = re.compile(r"^FOR VALUES FROM \('?(?P<lower>[^')]+)'?\) TO \('?(?P<upper>[^')]+)'?\)$")
+
+
+def partition_name(table, suffix):
+    name = f'{table}_{suffix}'
+    if len(name) <= POSTGRESQL_IDENTIFIER_LEN:
+        return name
+    # PostgreSQL would silently truncate the name, possibly to the name of another partition
+    digest = hashlib.md5(table.encode()).hexdigest()[:8]
+    return f'{table[:POSTGRESQL_IDENTIFIER_LEN - len(suffix) - 10]}_{digest}_{suffix}'
+
+
+def get_partitioning(model):
+    """Return the `Partitioning` of a dynamic model, `None` when its table is not partitioned."""
+    definition = getattr(model, '_partitioning', None)
+    return Partitioning(model, definition) if definition else None
+
+
+class Partitioning:
+    def __init__(self, model, definition, using=DEFAULT_DB_ALIAS):
+        self.model = model
+        self.definition = definition
+        self.using = using
+        self.table = model._meta.db_table
+        self.field = model._meta.get_field(definition['column'])
+        self.is_datetime = self.field.get_internal_type() == 'DateTimeField'
+
+    @property
+    def method(self):
+        return self.definition['method']
+
+    def _quote(self, name):
+        return connections[self.using].ops.quote_name(name)
+
+    def create_table(self, editor):
+        """Create the partitioned table and its initial partitions, instead of `create_model()`."""
+        model, table = self.model, self._quote(self.table)
+        sequence = self._quote(partition_name(self.table, 'id_seq'))
+        pk = model._meta.pk
+        columns = [f'{self._quote(pk.column)} bigint NOT NULL DEFAULT nextval(\'{sequence}\')']
+        params = []
+        for field in model._meta.local_fields:
+            if field.primary_key:
+                continue
+            definition, field_params = editor.column_sql(model, field)
+            columns.append(f'{self._quote(field.column)} {definition}')
+            params.extend(field_params or ())
+        columns.append(f'PRIMARY KEY ({self._quote(pk.column)}, {self._quote(self.field.column)})')
+
+        editor.execute(f'CREATE SEQUENCE {sequence}')
+        editor.execute(
+            f'CREATE TABLE {table} ({", ".join(columns)}) '
+            f'PARTITION BY {self.method.upper()} ({self._quote(self.field.column)})',
+            params or None,
+        )
+        editor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.{self._quote(pk.column)}')
+        editor.deferred_sql.extend(editor._model_indexes_sql(model))
+        for constraint in model._meta.constraints:
+            editor.add_constraint(model, constraint)
+
+        if self.method == 'hash':
+            modulus = self.definition['partitions']
+            for remainder in range(modulus):
+                editor.execute(
+                    f'CREATE TABLE {self._quote(partition_name(self.table, f"p{remainder}"))} PARTITION OF {table} '
+                    f'FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})'
+                )
+        else:
+            editor.execute(
+                f'CREATE TABLE {self._quote(partition_name(self.table, "default"))} PARTITION OF {table} DEFAULT'
+            )
+            self.create_partitions(editor, self.missing_ranges(self.get_current_start()))
+
+    def rename(self, editor, old_table):
+        """Rename the sequence and the partitions named after `old_table` once the table itself is renamed."""
+        editor.execute(
+            f'ALTER SEQUENCE {self._quote(partition_name(old_table, "id_seq"))} '
+            f'RENAME TO {self._quote(partition_name(self.table, "id_seq"))}'
+        )
+        if self.method == 'hash':
+            suffixes = [f'p{remainder}' for remainder in range(self.definition['partitions'])]
+        else:
+            suffixes = ['default', *(self.suffix(lower) for _, lower, _ in self.get_partitions())]
+        children = set(self.get_child_names())
+        for suffix in suffixes:
+            old_name = partition_name(old_table, suffix)
+            if old_name in children:
+                editor.execute(
+                    f'ALTER TABLE {self._quote(old_name)} RENAME TO {self._quote(partition_name(self.table, suffix))}'
+                )
+
+    def get_child_names(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = %s::regclass',
+                [self._quote(self.table)],
+            )
+            return [name for name, in cursor.fetchall()]
+
+    # range partitions
+
+    def get_current_start(self, now=None):
+        """Return the lower bound of the range the current time, or the highest partitioned number, falls into."""
+        if self.is_datetime:
+            now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+            start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            unit = self.definition['interval']
+            if unit == 'week':
+                return start - timedelta(days=start.weekday())
+            if unit == 'month':
+                return start.replace(day=1)
+            if unit == 'year':
+                return start.replace(month=1, day=1)
+            return start
+
+        # ranges are aligned to the interval, the highest number falls into the highest non-empty partition,
+        # found without scanning the table; numbers beyond all partitions are in the default one and ignored
+        with connections[self.using].cursor() as cursor:
+            for name, lower, _ in reversed(self.get_partitions()):
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {self._quote(name)})')
+                if cursor.fetchone()[0]:
+                    return lower
+        return 0
+
+    def shift(self, start, intervals):
+        if not self.is_datetime:
+            return start + intervals * self.definition['interval']
+        unit = self.definition['interval']
+        if unit in ('day', 'week'):
+            return start + timedelta(days=intervals * (7 if unit == 'week' else 1))
+        months = intervals * (12 if unit == 'year' else 1)
+        year, month = divmod(start.month - 1 + months, 12)
+        return start.replace(year=start.year + year, month=month + 1)
+
+    def suffix(self, start):
+        if self.is_datetime:
+            return 'p' + start.strftime({'year': '%Y', 'month': '%Y%m'}.get(self.definition['interval'], '%Y%m%d'))
+        return f'p{int(start)}'.replace('-', 'm')
+
+    def parse_bound(self, value):
+        return datetime.fromisoformat(value) if self.is_datetime else float(value)
+
+    def get_partitions(self):
+        """Return `(name, lower, upper)` of all range partitions, without the default one."""
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = %s::regclass',
+                [self._quote(self.table)],
+            )
+            rows = cursor.fetchall()
+        partitions = []
+        for name, bound in rows:
+            match = _bound_re.match(bound)
+            if match:
+                partitions.append((name, self.parse_bound(match['lower']), self.parse_bound(match['upper'])))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def missing_ranges(self, start):
+        """Return ranges from the current one to `premake` intervals ahead which have no partition yet."""
+        existing = [(lower, upper) for _, lower, upper in self.get_partitions()]
+        ranges = []
+        for i in range(self.definition.get('premake', DEFAULT_PREMAKE) + 1):
+            lower, upper = self.shift(start, i), self.shift(start, i + 1)
+            if not any(lower < existing_upper and existing_lower < upper for existing_lower, existing_upper in existing):
+                ranges.append((lower, upper))
+        return ranges
+
+    def default_has_rows(self, lower, upper):
+        """Tell if the default partition has rows of the range, a partition of the range cannot be created then."""
+        column = self._quote(self.field.column)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM {self._quote(partition_name(self.table, "default"))} '
+                f'WHERE {column} >= %s AND {column} < %s)',
+                [lower, upper],
+            )
+            return cursor.fetchone()[0]
+
+    def create_partitions(self, editor, ranges):
+        names = []
+        for lower, upper in ranges:
+            name = partition_name(self.table, self.suffix(lower))
+            editor.execute(
+                f'CREATE TABLE {self._quote(name)} PARTITION OF {self._quote(self.table)} FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper],
+            )
+            names.append(name)
+        return names
+
+    def maintain(self, now=None):
+        """Create missing future range partitions and drop expired ones, return their names."""
+        if self.method != 'range':
+            return [], []
+        start = self.get_current_start(now)
+        retention = self.definition.get('retention')
+        expired = []
+        if retention is not None:
+            oldest = self.shift(start, -retention)
+            expired = [name for name, _, upper in self.get_partitions() if upper <= oldest]
+
+        ranges = []
+        for lower, upper in self.missing_ranges(start):
+            if self.default_has_rows(lower, upper):
+                # moving the rows would lock the whole table, they stay in the default partition
+                logger.warning('Rows of %s from %s to %s are in the default partition, skipping it',
+                               self.table, lower, upper)
+            else:
+                ranges.append((lower, upper))
+
+        with connections[self.using].schema_editor() as editor:
+            created = self.create_partitions(editor, ranges)
+            for name in expired:
+                # dropping a partition is a catalog change, unlike deleting its rows
+                editor.execute(f'DROP TABLE {self._quote(name)}')
+        return created, expired
@@ -0,0 +1,70 @@
+"""
+Table descriptions of `GET /table/<name>`, served from the per-process `SchemaDescriptionCache`.
+
+A description has the shape of the `TableSerializer` input, so it can be edited and
+sent back with `PUT`, plus the schema version and a row estimate of the planner
+statistics. Schema changes evict descriptions; while the schema listener of the
+process is connected the changes of other workers arrive as notifications and a
+cached description is served without any query, otherwise the schema version is
+checked with one query.
+Cached row estimates are refreshed after `TABLES_DESCRIBE_CACHE_TIMEOUT` seconds.
+"""
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .dynamic_models_cache import SchemaDescriptionCache
+from .field_types import field_types
+from .models import ModelSchema
+from .schema_events import listener_running
+
+
+def estimate_rows(schema):
+    """Return the row estimate of `ANALYZE`/autovacuum, summed over partitions, `None` before the first one."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE relkind = 'r' AND (oid = %s::regclass OR oid IN "
+            "(SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass))",
+            [connection.ops.quote_name(schema.table_name)] * 2,
+        )
+        # -1 for tables never analyzed
+        estimates = [reltuples for reltuples, in cursor.fetchall() if reltuples >= 0]
+    return int(sum(estimates)) if estimates else None
+
+
+def describe_schema(schema):
+    return {
+        'name': schema.name,
+        'version': schema.version,
+        'fields': [
+            {'name': field.name, 'field_type': field_types.get_by_class_name(field.class_name).key,
+             'args': field.kwargs}
+            for field in schema.fields.all()
+        ],
+        'indexes': schema.indexes,
+        'partitioning': schema.partitioning,
+        'row_estimate': estimate_rows(schema),
+    }
+
+
+def _is_fresh(built_at):
+    return time.monotonic() - built_at < getattr(settings, 'TABLES_DESCRIBE_CACHE_TIMEOUT', 60)
+
+
+def get_description(table_name):
+    """Return the schema primary key and the description of a table, raise `ModelSchema.DoesNotExist`."""
+    cache = SchemaDescriptionCache()
+    cached = cache.get(table_name)
+    if cached is not None and _is_fresh(cached[2]):
+        schema_pk, version, _, description = cached
+        if listener_running():
+            return schema_pk, description
+        # without notifications the changes of other workers are only visible in the database
+        if ModelSchema.objects.filter(pk=schema_pk, name=table_name, version=version).exists():
+            return schema_pk, description
+
+    schema = ModelSchema.objects.prefetch_related('fields').get(name=table_name)
+    description = describe_schema(schema)
+    cache.set(table_name, schema.pk, schema.version, time.monotonic(), description)
+    return schema.pk, description
@@ -0,0 +1,122 @@
+"""Publish and receive schema changes between worker processes.
+
+Every schema version bump is announced with PostgreSQL `NOTIFY`, a listener
+thread in each worker evicts only the affected model and table description from
+its local caches. Server processes start it with `start_listener()` from the
+WSGI/ASGI entry points, forked workers start their own.
+"""
+import json
+import logging
+import os
+import select
+import threading
+
+import psycopg2
+from django.conf import settings
+from django.db import connections
+from django.db.utils import DEFAULT_DB_ALIAS
+
+from .constants import SCHEMA_CHANGES_CHANNEL
+from .dynamic_models_cache import ModelCache, SchemaDescriptionCache
+from .dynamic_models_editor import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def publish_schema_change(schema_pk, version, using=DEFAULT_DB_ALIAS):
+    # NOTIFY is transactional, listeners are notified only once the change is committed
+    payload = json.dumps({'pk': schema_pk, 'version': version})
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [SCHEMA_CHANGES_CHANNEL, payload])
+
+
+def handle_schema_change(payload):
+    event = json.loads(payload)
+    SchemaDescriptionCache().invalidate(event['pk'], event['version'])
+    model = ModelCache().invalidate(event['pk'], event['version'])
+    if model is None:
+        return
+
+    ModelRegistry().unregister_model_class(model)
+
+
+class SchemaChangeListener(threading.Thread):
+    """Listen for schema changes on a dedicated connection, outside of Django's connection handling."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, poll_timeout=5.0, reconnect_delay=1.0):
+        super().__init__(name='tables-schema-listener', daemon=True)
+        self.using = using
+        self.poll_timeout = poll_timeout
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = threading.Event()
+        self.listening = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error:
+                logger.exception('Schema change listener disconnected')
+                # notifications sent while disconnected are lost, start from scratch
+                ModelCache().clear()
+                SchemaDescriptionCache().clear()
+                self._stop_event.wait(self.reconnect_delay)
+
+    def _listen(self):
+        conn = psycopg2.connect(**connections[self.using].get_connection_params())
+        try:
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {SCHEMA_CHANGES_CHANNEL}')
+            self.listening.set()
+
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        handle_schema_change(notify.payload)
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning('Invalid schema change payload: %r', notify.payload)
+        finally:
+            self.listening.clear()
+            conn.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+_fork_hook_registered = False
+
+
+def start_listener():
+    """Start the listener of this process with `TABLES_SCHEMA_LISTENER`, return it, `None` when disabled."""
+    global _listener, _fork_hook_registered
+    if not getattr(settings, 'TABLES_SCHEMA_LISTENER', False):
+        return None
+    with _listener_lock:
+        if not _fork_hook_registered:
+            # threads do not survive a fork, e.g. of `gunicorn --preload` workers
+            os.register_at_fork(after_in_child=_start_listener_in_child)
+            _fork_hook_registered = True
+        if _listener is None or not _listener.is_alive():
+            _listener = SchemaChangeListener()
+            _listener.start()
+        return _listener
+
+
+def _start_listener_in_child():
+    global _listener, _listener_lock
+    # the copied listener has no thread and may hold the copied lock
+    _listener, _listener_lock = None, threading.Lock()
+    start_listener()
+
+
+def listener_running():
+    """Whether the listener of this process receives notifications, so cached schemas are current."""
+    listener = _listener
+    return listener is not None and listener.listening.is_set()
@@ -0,0 +1,123 @@
+"""Background execution of queued table updates, see `SchemaChangeJob`."""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SchemaChangeJob
+from .table_editor import TableEditor
+
+logger = logging.getLogger(__name__)
+
+
+def job_timeout():
+    return getattr(settings, 'TABLES_SCHEMA_JOB_TIMEOUT', 300)
+
+
+def fail_stale_jobs():
+    """Fail running jobs without a heartbeat for `TABLES_SCHEMA_JOB_TIMEOUT` seconds, return their number.
+
+    Such a job is assumed to be left behind by a runner that died, it would block
+    further updates of its table forever. The job is not retried, the change may
+    have been partially applied.
+    """
+    silent_since = timezone.now() - timedelta(seconds=job_timeout())
+    # jobs claimed before heartbeats were recorded have none
+    silent = Q(heartbeat_at__lt=silent_since) | Q(heartbeat_at__isnull=True, started_at__lt=silent_since)
+    count = SchemaChangeJob.objects.filter(silent, status=SchemaChangeJob.RUNNING).update(
+        status=SchemaChangeJob.FAILED, error='The job stopped reporting, its runner has probably stopped.',
+        finished_at=timezone.now(),
+    )
+    if count:
+        logger.warning('Failed %d stale schema change jobs', count)
+    return count
+
+
+class Heartbeat(threading.Thread):
+    """Touch `heartbeat_at` of a running job periodically, also during long statements of the job."""
+
+    def __init__(self, job_pk, interval):
+        super().__init__(name=f'tables-schema-job-{job_pk}-heartbeat', daemon=True)
+        self.job_pk = job_pk
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    touch_job(self.job_pk)
+                except DatabaseError:
+                    logger.warning('Heartbeat of schema change job %s failed', self.job_pk, exc_info=True)
+        finally:
+            # the thread has its own connection
+            connection.close()
+
+
+def touch_job(job_pk, **values):
+    return SchemaChangeJob.objects.filter(pk=job_pk, status=SchemaChangeJob.RUNNING).update(
+        heartbeat_at=timezone.now(), **values
+    )
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, `None` when the queue is empty."""
+    with transaction.atomic():
+        # concurrent runners skip jobs already being claimed
+        job = (
+            SchemaChangeJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SchemaChangeJob.PENDING).order_by('pk').first()
+        )
+        if job is None:
+            return None
+        job.status = SchemaChangeJob.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def run_job(job):
+    def progress(value):
+        touch_job(job.pk, progress=value)
+
+    heartbeat = Heartbeat(job.pk, job_timeout() / 5)
+    heartbeat.start()
+    try:
+        table_name = job.model_schema.name
+        TableEditor(job.data).update(table_name, progress=progress)
+    except Exception as err:
+        logger.exception('Schema change job %s failed', job.pk)
+        job.status = SchemaChangeJob.FAILED
+        job.error = str(err)
+    else:
+        job.status = SchemaChangeJob.SUCCEEDED
+        job.progress = 1
+    finally:
+        heartbeat.stop()
+    job.finished_at = timezone.now()
+    # a job failed as stale keeps its status, the table may have been changed directly since
+    finished = SchemaChangeJob.objects.filter(pk=job.pk, status=SchemaChangeJob.RUNNING).update(
+        status=job.status, progress=job.progress, error=job.error, finished_at=job.finished_at,
+    )
+    if not finished:
+        logger.warning('Schema change job %s finished as %s after it was failed as stale', job.pk, job.status)
+        job.refresh_from_db()
+    return job
+
+
+def run_pending_jobs():
+    """Run pending jobs until the queue is empty, return the number of jobs run."""
+    fail_stale_jobs()
+    count = 0
+    while (job := claim_next_job()) is not None:
+        run_job(job)
+        count += 1
+    return count
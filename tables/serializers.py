@@ -1,6 +1,21 @@
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connection
+from django.db.models import Avg, BigAutoField, Count, Max, Min, Sum, UniqueConstraint
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from .field_types import field_types
+from .models import SchemaChangeJob
 from .constants import TABLE_MODEL_IDENTIFIER_REGEX, TABLE_FIELD_IDENTIFIER_REGEX, TABLE_IDENTIFIER_LEN
+from . import metrics
+from .filters import InvalidFilterError, parse_filters
+from .pagination import InvalidCursorError, KeysetPaginator, decode_cursor, is_indexed
+from .partitioning import DEFAULT_PREMAKE, INTERVAL_UNITS, get_partitioning
 
 
 class FieldSerializer(serializers.Serializer):
@@ -8,7 +23,7 @@ class FieldSerializer(serializers.Serializer):
         'invalid': f'Field name should start with a small letter and contain only small letters, digits, and underscores.'
                    f' Max length is {TABLE_IDENTIFIER_LEN}.'
     })
-    field_type = serializers.ChoiceField(choices=['string', 'number', 'boolean'])
+    field_type = serializers.ChoiceField(choices=field_types.keys())
     args = serializers.DictField(required=False)
 
     def validate(self, data):
@@ -17,12 +32,82 @@ class FieldSerializer(serializers.Serializer):
         return data
 
 
+def operator_class_exists(method, opclass, db_type):
+    """Tell if the access method has the operator class, for the column type or a type it converts to for free."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_opclass o JOIN pg_am a ON a.oid = o.opcmethod "
+            "WHERE a.amname = %s AND o.opcname = %s AND (o.opcintype = %s::regtype OR EXISTS "
+            "(SELECT 1 FROM pg_cast c WHERE c.castsource = %s::regtype AND c.casttarget = o.opcintype "
+            "AND c.castmethod = 'b'))",
+            [method, opclass, db_type, db_type],
+        )
+        return cursor.fetchone() is not None
+
+
+class IndexSerializer(serializers.Serializer):
+    WHERE_LOOKUPS = {'exact', 'gt', 'gte', 'lt', 'lte', 'isnull'}
+
+    columns = serializers.ListField(child=serializers.RegexField(TABLE_FIELD_IDENTIFIER_REGEX), allow_empty=False)
+    unique = serializers.BooleanField(default=False)
+    method = serializers.ChoiceField(choices=['btree', 'hash', 'gin', 'brin'], default='btree')
+    # partial index condition, `{"column": value}` or `{"column__lookup": value}` joined with AND
+    where = serializers.DictField(required=False, default=dict)
+    opclasses = serializers.ListField(child=serializers.RegexField(r'^[a-z_][a-z0-9_]*$'), required=False, default=list)
+
+    def validate_where(self, where):
+        for lookup, value in where.items():
+            column, _, lookup_name = lookup.partition('__')
+            if lookup_name and lookup_name not in self.WHERE_LOOKUPS:
+                raise serializers.ValidationError(f'Unsupported lookup: {lookup}')
+            if isinstance(value, (dict, list)):
+                raise serializers.ValidationError(f'Value of {lookup} should be a scalar.')
+        return where
+
+    def validate(self, data):
+        if len(set(data['columns'])) != len(data['columns']):
+            raise serializers.ValidationError({'columns': 'Index columns should be unique.'})
+        if data['unique'] and data['method'] != 'btree':
+            raise serializers.ValidationError({'unique': 'Only btree indexes can be unique.'})
+        if data['method'] == 'hash' and len(data['columns']) > 1:
+            raise serializers.ValidationError({'method': 'Hash indexes support a single column.'})
+        # none of the column types has a default GIN operator class
+        if data['method'] == 'gin' and not data['opclasses']:
+            raise serializers.ValidationError({'opclasses': 'GIN indexes require an operator class for every column.'})
+        if data['opclasses'] and len(data['opclasses']) != len(data['columns']):
+            raise serializers.ValidationError({'opclasses': 'Provide an operator class for every column.'})
+        return data
+
+
+class PartitioningSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['range', 'hash'])
+    column = serializers.RegexField(TABLE_FIELD_IDENTIFIER_REGEX)
+    # range partitions: a unit of datetime columns or the width of number ranges
+    interval = serializers.JSONField(required=False)
+    premake = serializers.IntegerField(min_value=0, max_value=366, default=DEFAULT_PREMAKE)
+    retention = serializers.IntegerField(min_value=1, required=False)
+    # hash partitions
+    partitions = serializers.IntegerField(min_value=2, max_value=1024, required=False)
+
+    def validate(self, data):
+        if data['method'] == 'hash':
+            if 'partitions' not in data:
+                raise serializers.ValidationError({'partitions': 'Hash partitioning requires the number of partitions.'})
+            return {'method': 'hash', 'column': data['column'], 'partitions': data['partitions']}
+        if 'interval' not in data:
+            raise serializers.ValidationError({'interval': 'Range partitioning requires an interval.'})
+        data.pop('partitions', None)
+        return data
+
+
 class TableSerializer(serializers.Serializer):
     name = serializers.RegexField(TABLE_MODEL_IDENTIFIER_REGEX, error_messages={
         'invalid': f'Model name should start with a letter and contain only letters, digits, and underscores.'
                    f' Max length is {TABLE_IDENTIFIER_LEN}.'
     })
     fields = FieldSerializer(many=True)
+    indexes = IndexSerializer(many=True, required=False, default=list)
+    partitioning = PartitioningSerializer(required=False, allow_null=True, default=None)
 
     def validate_fields(self, fields):
         if len(fields) == 0:
@@ -36,11 +121,466 @@ class TableSerializer(serializers.Serializer):
                 raise serializers.ValidationError(f"All fields names should be unique: {field['name']}")
         return fields
 
+    def validate(self, data):
+        column_names = {'id', *(field['name'] for field in data['fields'])}
+        for index in data['indexes']:
+            index_columns = {*index['columns'], *(lookup.split('__')[0] for lookup in index['where'])}
+            unknown = index_columns - column_names
+            if unknown:
+                raise serializers.ValidationError({'indexes': f"Unknown index columns: {', '.join(sorted(unknown))}"})
+        if data['indexes']:
+            self.validate_index_columns(data)
+        if data['partitioning']:
+            self.validate_partitioning_columns(data)
+        return data
+
+    @staticmethod
+    def validate_index_columns(data):
+        """Check the partial index values and the operator classes against the column types."""
+        columns = {'id': BigAutoField(primary_key=True)}
+        for field in data['fields']:
+            try:
+                columns[field['name']] = field_types.get(field['field_type']).make_field(field['args'])
+            except TypeError as e:
+                raise serializers.ValidationError({'fields': f"Invalid arguments of {field['name']}: {e}"})
+
+        for index in data['indexes']:
+            for lookup, value in index['where'].items():
+                column, _, lookup_name = lookup.partition('__')
+                if lookup_name == 'isnull':
+                    if not isinstance(value, bool):
+                        raise serializers.ValidationError({'indexes': f'Value of {lookup} should be a boolean.'})
+                    continue
+                if value is None:
+                    # `{"column": null}` is IS NULL, other lookups cannot compare with null
+                    if lookup_name not in ('', 'exact'):
+                        raise serializers.ValidationError({'indexes': f'Value of {lookup} cannot be null.'})
+                    continue
+                try:
+                    columns[column].to_python(value)
+                except (DjangoValidationError, TypeError, ValueError):
+                    raise serializers.ValidationError({'indexes': f'Invalid value of {lookup}: {value!r}'})
+
+            for column, opclass in zip(index['columns'], index['opclasses']):
+                if not operator_class_exists(index['method'], opclass, columns[column].db_type(connection)):
+                    raise serializers.ValidationError({
+                        'indexes': f"Operator class {opclass} of {index['method']} is not available for {column}."
+                    })
+
+    @staticmethod
+    def validate_partitioning_columns(data):
+        partitioning = data['partitioning']
+        column = partitioning['column']
+        field = next((field for field in data['fields'] if field['name'] == column), None)
+        if field is None:
+            raise serializers.ValidationError({'partitioning': f'Unknown partition column: {column}'})
+        # the partition column is a part of the primary key
+        if field['args'].get('null'):
+            raise serializers.ValidationError({'partitioning': 'The partition column cannot be nullable.'})
+
+        if partitioning['method'] == 'range':
+            interval = partitioning['interval']
+            if field['field_type'] == 'datetime':
+                if interval not in INTERVAL_UNITS:
+                    raise serializers.ValidationError(
+                        {'partitioning': f"Interval of a datetime column should be one of {', '.join(INTERVAL_UNITS)}."}
+                    )
+            elif field['field_type'] in ('number', 'integer'):
+                if isinstance(interval, bool) or not isinstance(interval, int) or interval <= 0:
+                    raise serializers.ValidationError(
+                        {'partitioning': 'Interval of a number column should be a positive integer.'}
+                    )
+            else:
+                raise serializers.ValidationError(
+                    {'partitioning': 'Range partitioning requires a datetime, number or integer column.'}
+                )
+
+        # PostgreSQL enforces uniqueness only per partition
+        for other in data['fields']:
+            if other['name'] != column and other['args'].get('unique'):
+                raise serializers.ValidationError(
+                    {'fields': f"Unique columns of a partitioned table are not supported: {other['name']}"}
+                )
+        for index in data['indexes']:
+            if index['unique'] and column not in index['columns']:
+                raise serializers.ValidationError(
+                    {'indexes': 'Unique indexes of a partitioned table should include the partition column.'}
+                )
+
+
+class ColumnsField(serializers.CharField):
+    """Comma separated column names of the model in the serializer context."""
+
+    def __init__(self, *, field_types=None, **kwargs):
+        # internal types of allowed columns, `None` allows all
+        self.field_types = field_types
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        names = [name.strip() for name in super().to_internal_value(data).split(',') if name.strip()]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError('Columns should be unique.')
+        model = self.context['model']
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise serializers.ValidationError(f'Unknown column: {name}')
+            if self.field_types is not None and field.get_internal_type() not in self.field_types:
+                raise serializers.ValidationError(f'Unsupported column type: {name}')
+        return names
+
+
+class AggregateSerializer(serializers.Serializer):
+    NUMERIC_FIELD_TYPES = {'FloatField', 'IntegerField', 'BigIntegerField', 'BigAutoField'}
+    # PostgreSQL has no min()/max() of booleans
+    COMPARABLE_FIELD_TYPES = {*NUMERIC_FIELD_TYPES, 'TextField', 'CharField', 'DateTimeField'}
+    FUNCTIONS = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+
+    group_by = ColumnsField(required=False, default=list)
+    count = serializers.BooleanField(default=False)
+    sum = ColumnsField(required=False, default=list, field_types=NUMERIC_FIELD_TYPES)
+    avg = ColumnsField(required=False, default=list, field_types=NUMERIC_FIELD_TYPES)
+    min = ColumnsField(required=False, default=list, field_types=COMPARABLE_FIELD_TYPES)
+    max = ColumnsField(required=False, default=list, field_types=COMPARABLE_FIELD_TYPES)
+
+    def validate(self, data):
+        if not data['count'] and not any(data[function] for function in self.FUNCTIONS):
+            raise serializers.ValidationError('Request at least one of count, sum, avg, min or max.')
+        return data
+
+    def get_aggregates(self):
+        """Return aggregate expressions by alias, aliases cannot collide with column names."""
+        aggregates = {'_count': Count('pk')} if self.validated_data['count'] else {}
+        for function, aggregate in self.FUNCTIONS.items():
+            for column in self.validated_data[function]:
+                aggregates[f'_{function}_{column}'] = aggregate(column)
+        return aggregates
+
+    def to_result(self, row):
+        """Turn a row of `get_aggregates()` values into `{"group": {...}, "count": n, "sum": {...}, ...}`."""
+        result = {}
+        if self.validated_data['group_by']:
+            result['group'] = {column: row[column] for column in self.validated_data['group_by']}
+        if self.validated_data['count']:
+            result['count'] = row['_count']
+        for function in self.FUNCTIONS:
+            if self.validated_data[function]:
+                result[function] = {column: row[f'_{function}_{column}'] for column in self.validated_data[function]}
+        return result
+
+
+class SchemaChangeJobSerializer(serializers.ModelSerializer):
+    table = serializers.CharField(source='model_schema.name')
+
+    class Meta:
+        model = SchemaChangeJob
+        fields = ['id', 'table', 'status', 'progress', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+
+
+def max_unpaginated_rows():
+    return getattr(settings, 'TABLES_ROWS_MAX_PAGE_SIZE', 10000)
+
+
+class RowsPageSerializer(serializers.Serializer):
+    """
+    Validate `?limit=&after=&order_by=&fields=` and `where.` filters of the rows endpoint,
+    requires `model` in the context.
+    """
+    limit = serializers.IntegerField(min_value=1, required=False)
+    after = serializers.CharField(required=False)
+    # comma separated, a single indexed NOT NULL column when paginated
+    order_by = serializers.CharField(required=False, default='id')
+    fields = ColumnsField(required=False)
+
+    def validate_limit(self, limit):
+        max_limit = getattr(settings, 'TABLES_ROWS_MAX_PAGE_SIZE', 10000)
+        if limit > max_limit:
+            raise serializers.ValidationError(f'Ensure this value is less than or equal to {max_limit}.')
+        return limit
+
+    def validate_after(self, after):
+        try:
+            return decode_cursor(after)
+        except InvalidCursorError as err:
+            raise serializers.ValidationError(str(err))
+
+    def validate_order_by(self, order_by):
+        model = self.context['model']
+        columns = order_by.split(',')
+        if self.is_paginated and len(columns) > 1:
+            raise serializers.ValidationError('Pages of rows can be ordered by a single column.')
+        for column in columns:
+            field_name = column.lstrip('-')
+            try:
+                field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                raise serializers.ValidationError(f'Unknown column: {field_name}')
+            if self.is_paginated and (field.null or not is_indexed(model, field_name)):
+                raise serializers.ValidationError(f'Rows can be ordered only by indexed NOT NULL columns: {field_name}')
+        return order_by
 
+    def validate(self, data):
+        if 'after' in data and data['after']['order_by'] != data['order_by']:
+            raise serializers.ValidationError({'after': 'Cursor does not match the requested ordering.'})
+        if 'limit' not in data:
+            data['limit'] = getattr(settings, 'TABLES_ROWS_PAGE_SIZE', 100)
+        try:
+            data['where'] = parse_filters(self.context['model'], self.initial_data)
+        except InvalidFilterError as err:
+            raise serializers.ValidationError(err.errors)
+        return data
+
+    def get_ordering(self):
+        ordering = self.validated_data['order_by'].split(',')
+        pk_name = self.context['model']._meta.pk.name
+        # the primary key breaks ties, so reads cut at a limit are repeatable
+        if pk_name not in (column.lstrip('-') for column in ordering):
+            ordering.append(pk_name)
+        return ordering
+
+    def get_field_names(self):
+        """Return the projected columns, `None` for all of them."""
+        field_names = self.validated_data.get('fields')
+        if not field_names:
+            return None
+        if self.is_paginated:
+            # the cursor of the next page is made of the ordering column and the primary key
+            cursor_columns = [self.context['model']._meta.pk.name, self.validated_data['order_by'].lstrip('-')]
+            field_names = [*field_names, *(name for name in cursor_columns if name not in field_names)]
+        return tuple(field_names)
+
+    @property
+    def is_paginated(self):
+        return 'limit' in self.initial_data or 'after' in self.initial_data
+
+    def get_encoder(self):
+        return row_encoder_for_model(self.context['model'], self.get_field_names())
+
+    def get_queryset(self):
+        """Return the filtered rows, of an unpaginated read ordered and cut one row over the limit."""
+        queryset = self.context['model'].objects.filter(self.validated_data['where'])
+        if self.is_paginated:
+            return queryset
+        # one more row tells if there are more rows than the limit
+        return queryset.order_by(*self.get_ordering())[:max_unpaginated_rows() + 1]
+
+    def get_paginator(self):
+        return KeysetPaginator(self.context['model'], self.validated_data['order_by'], self.validated_data['limit'])
+
+
+class RowsMutationSerializer(serializers.Serializer):
+    """
+    Validate `?batch_size=&all=` and `where.` filters of the row update and delete endpoints,
+    requires `model` in the context.
+    """
+    batch_size = serializers.IntegerField(min_value=1, required=False, default=None)
+    # changing every row has to be explicit
+    all = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        try:
+            data['where'] = parse_filters(self.context['model'], self.initial_data)
+        except InvalidFilterError as err:
+            raise serializers.ValidationError(err.errors)
+        if not data['where'] and not data['all']:
+            raise serializers.ValidationError('Filter the rows with where. parameters, or pass all=true.')
+        return data
+
+
+class RowValuesSerializer(serializers.Serializer):
+    """Validate `{"set": {column: value}}` assignments of the row update endpoint, requires `model` in the context."""
+    set = serializers.DictField(allow_empty=False)
+
+    def validate_set(self, values):
+        model = self.context['model']
+        column_names = {field.name for field in model._meta.fields if not field.primary_key}
+        unknown = set(values) - column_names
+        if unknown:
+            raise serializers.ValidationError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+        # the row serializer validates and converts the values, unique columns are checked by the database
+        serializer = dynamic_serializer_for_model(model)(data=values, partial=True)
+        for field in serializer.fields.values():
+            field.validators = [validator for validator in field.validators if not isinstance(validator, UniqueValidator)]
+        if not serializer.is_valid():
+            raise serializers.ValidationError(serializer.errors)
+        return serializer.validated_data
+
+
+class RowsUpsertSerializer(serializers.Serializer):
+    """
+    Validate `{"on": [columns], "update": [columns], "rows": [...]}` of the upsert endpoint,
+    requires `model` in the context. Rows conflicting on the `on` columns update the `update`
+    columns, by default all given columns, with no columns to update they are left as they are.
+    """
+    on = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    update = serializers.ListField(child=serializers.CharField(), required=False)
+    rows = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_on(self, columns):
+        if self.context['model']._meta.pk.name in columns:
+            # the primary key is read-only, rows never have it
+            raise serializers.ValidationError('The primary key cannot be a conflict column.')
+        if not self.is_conflict_target(self.context['model'], columns):
+            raise serializers.ValidationError('Columns should be the columns of a unique constraint of the table.')
+        return columns
+
+    def validate_rows(self, rows):
+        max_rows = getattr(settings, 'TABLES_BULK_INSERT_MAX_ROWS', 10000)
+        if len(rows) > max_rows:
+            raise serializers.ValidationError(f'Ensure this field has no more than {max_rows} elements.')
+        return rows
+
+    def validate_update(self, columns):
+        column_names = {field.name for field in self.context['model']._meta.fields}
+        unknown = set(columns) - column_names
+        if unknown:
+            raise serializers.ValidationError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        return columns
+
+    def get_rows(self):
+        """Return the validated rows and the errors of invalid rows, with their positions in the request."""
+        model = self.context['model']
+        # the database checks unique columns, conflicts are the point
+        serializer = dynamic_serializer_for_model(model)(data=self.validated_data['rows'], many=True)
+        for field in serializer.child.fields.values():
+            field.validators = [validator for validator in field.validators if not isinstance(validator, UniqueValidator)]
+        if not serializer.is_valid():
+            return None, [{'index': i, 'errors': row_errors} for i, row_errors in enumerate(serializer.errors) if row_errors]
+
+        errors = []
+        keys = {}
+        for i, row in enumerate(serializer.validated_data):
+            key = tuple(row.get(column) for column in self.validated_data['on'])
+            if None in key:
+                errors.append({'index': i, 'errors': {'on': ['Conflict columns cannot be null.']}})
+            elif key in keys:
+                # PostgreSQL cannot update a row twice in one statement
+                errors.append({'index': i, 'errors': {'on': [f'Duplicates row {keys[key]}.']}})
+            else:
+                keys[key] = i
+        return serializer.validated_data, errors
+
+    def get_update_fields(self, rows):
+        update = self.validated_data.get('update')
+        if update is None:
+            given = {column for row in rows for column in row}
+            update = [field.name for field in self.context['model']._meta.fields if field.name in given]
+        return [column for column in update if column not in self.validated_data['on'] and column != 'id']
+
+    @staticmethod
+    def is_conflict_target(model, columns):
+        """Whether `ON CONFLICT (columns)` matches a unique index of the table."""
+        columns = set(columns)
+        if len(columns) == 1:
+            name = next(iter(columns))
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return False
+            # the primary key of a partitioned table includes the partition column
+            if field.unique and not (field.primary_key and get_partitioning(model)):
+                return True
+        return any(
+            isinstance(constraint, UniqueConstraint) and set(constraint.fields) == columns
+            and constraint.condition is None and not constraint.opclasses
+            for constraint in model._meta.constraints
+        )
+
+
+# projections of a model with a cached row encoder, the least recently used one is dropped
+ROW_ENCODERS_PER_MODEL = 32
+
+
+# model classes are rebuilt on every schema change, so caching per class is caching per schema version.
+# Serializers and encoders are kept on the model class, they are released with it when `ModelCache` evicts it.
 def dynamic_serializer_for_model(model):
-    return type(f'{model.__name__}Serializer', (serializers.ModelSerializer,), {
-        'Meta': type('Meta', (), {
-            'model': model,
-            'fields': "__all__"
-        })
-    })
+    serializer_class = model.__dict__.get('_row_serializer')
+    if serializer_class is None:
+        with metrics.timer('serializer_build'):
+            serializer_class = type(f'{model.__name__}Serializer', (serializers.ModelSerializer,), {
+                'Meta': type('Meta', (), {
+                    'model': model,
+                    'fields': "__all__"
+                })
+            })
+        model._row_serializer = serializer_class
+    return serializer_class
+
+
+class RowEncoder:
+    """
+    Turn `values_list()` (or async `values()`) rows of a dynamic model straight into representations,
+    without building a model instance and running `to_representation` per row.
+    """
+    # field types which database values are already JSON serializable
+    NATIVE_FIELD_TYPES = {
+        'AutoField', 'BigAutoField', 'SmallAutoField',
+        'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+        'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+        'FloatField', 'BooleanField', 'CharField', 'TextField',
+    }
+
+    def __init__(self, model, field_names=None):
+        serializer_fields = dynamic_serializer_for_model(model)().fields
+        if field_names is not None:
+            serializer_fields = {name: serializer_fields[name] for name in field_names}
+        self.field_names = tuple(serializer_fields.keys())
+        self._converters = tuple(
+            None if model._meta.get_field(name).get_internal_type() in self.NATIVE_FIELD_TYPES
+            else field.to_representation
+            for name, field in serializer_fields.items()
+        )
+        self._needs_conversion = any(self._converters)
+        self._dict_converters = tuple(
+            (name, convert) for name, convert in zip(self.field_names, self._converters) if convert is not None
+        )
+
+    def encode(self, row):
+        if self._needs_conversion:
+            row = [
+                value if convert is None or value is None else convert(value)
+                for convert, value in zip(self._converters, row)
+            ]
+        return dict(zip(self.field_names, row))
+
+    def encode_rows(self, queryset):
+        return [self.encode(row) for row in queryset.values_list(*self.field_names)]
+
+    def encode_dict(self, row):
+        for name, convert in self._dict_converters:
+            if row[name] is not None:
+                row[name] = convert(row[name])
+        return row
+
+    async def aencode_rows(self, queryset):
+        # `values_list().aiterator()` of Django 4.1 runs the query in the async context and fails, `values()` does not
+        return [self.encode_dict(row) async for row in queryset.values(*self.field_names).aiterator()]
+
+    def iter_rows(self, queryset, chunk_size):
+        # `iterator()` streams from a server-side cursor instead of fetching all rows at once
+        for row in queryset.values_list(*self.field_names).iterator(chunk_size=chunk_size):
+            yield self.encode(row)
+
+
+_row_encoders_lock = threading.Lock()
+
+
+def row_encoder_for_model(model, field_names=None):
+    """`field_names` is a tuple of projected columns, `None` encodes all of them."""
+    with _row_encoders_lock:
+        encoders = model.__dict__.get('_row_encoders')
+        if encoders is None:
+            encoders = model._row_encoders = OrderedDict()
+        encoder = encoders.get(field_names)
+        if encoder is not None:
+            encoders.move_to_end(field_names)
+            return encoder
+
+    encoder = RowEncoder(model, field_names)
+    with _row_encoders_lock:
+        encoders[field_names] = encoder
+        while len(encoders) > ROW_ENCODERS_PER_MODEL:
+            encoders.popitem(last=False)
+    return encoder
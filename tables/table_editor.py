@@ -1,3 +1,8 @@
+import uuid
+
+from tables.constants import POSTGRESQL_DYNAMIC_TABLE_PREFIX
+from tables.exceptions import PartitioningError
+from tables.field_types import field_types
 from tables.models import ModelSchema, FieldSchema
 
 
@@ -7,52 +12,88 @@ class TableEditor:
 
     @staticmethod
     def class_name_mapper(field_type: str) -> str:
-        return {
-            'string': 'django.db.models.TextField',
-            'number': 'django.db.models.FloatField',
-            'boolean': 'django.db.models.BooleanField',
-        }[field_type]
+        return field_types.get(field_type).class_name
 
-    def create(self) -> None:
-        schema = ModelSchema.objects.create(name=self.data['name'])
+    @staticmethod
+    def index_definitions(indexes: list, existing_indexes: list) -> list:
+        """Name index definitions, unchanged indexes keep their names and are not rebuilt."""
+        existing_names = {
+            repr(sorted((key, value) for key, value in index.items() if key != 'name')): index['name']
+            for index in existing_indexes
+        }
+        definitions = []
+        for index in indexes:
+            key = repr(sorted(index.items()))
+            # Django limits index names to 30 characters
+            name = existing_names.get(key) or f'{POSTGRESQL_DYNAMIC_TABLE_PREFIX}idx_{uuid.uuid4().hex[:20]}'
+            definitions.append({**index, 'name': name})
+        return definitions
 
-        for field in self.data['fields']:
-            FieldSchema.objects.create(
-                model_schema=schema, name=field['name'],
-                class_name=self.class_name_mapper(field['field_type']),
-                kwargs=field['args']
-            )
+    def create(self) -> None:
+        schema = ModelSchema(name=self.data['name'], partitioning=self.data.get('partitioning'))
+        # a single CREATE TABLE with all columns and indexes, partitioned tables cannot be built column by column
+        schema.create_with_fields(
+            [
+                FieldSchema(name=field['name'], class_name=self.class_name_mapper(field['field_type']),
+                            kwargs=field['args'])
+                for field in self.data['fields']
+            ],
+            indexes=self.index_definitions(self.data.get('indexes', []), []),
+        )
 
-    def update(self, table_name) -> None:
+    def update(self, table_name, progress=None) -> None:
         schema = ModelSchema.objects.get(name=table_name)
+        self.check_partitioning(schema)
+        removed_fields, updated_fields, created_fields = self.field_changes(schema)
 
-        # update schema name
-        if schema.name != self.data['name']:
-            schema.name = self.data['name']
-            schema.save()
+        # compute the whole diff first, the table is altered once
+        schema.apply_changes(
+            self.data['name'],
+            removed_fields=removed_fields, updated_fields=updated_fields, created_fields=created_fields,
+            indexes=self.index_definitions(self.data.get('indexes', []), schema.indexes),
+            progress=progress,
+        )
 
-        all_db_fields = FieldSchema.objects.filter(model_schema=schema)
-        all_db_fields_names = {o.name for o in all_db_fields}
-        all_data_names = {f['name'] for f in self.data['fields']}
+    def field_changes(self, schema):
+        """Return removed, updated and created `FieldSchema`s, the latter two unsaved."""
+        db_fields = {field.name: field for field in schema.fields.all()}
+        data_fields = {field['name']: field for field in self.data['fields']}
 
-        fields_for_creation = all_data_names - all_db_fields_names
-        fields_for_update = all_db_fields_names & all_data_names
-        fields_for_deletion = all_db_fields_names - all_data_names
+        removed_fields = [field for name, field in db_fields.items() if name not in data_fields]
+        updated_fields = []
+        created_fields = []
+        for name, field in data_fields.items():
+            class_name = self.class_name_mapper(field['field_type'])
+            if name not in db_fields:
+                created_fields.append(FieldSchema(
+                    model_schema=schema, name=name, class_name=class_name, kwargs=field['args']
+                ))
+                continue
 
-        for field_name in fields_for_deletion:
-            FieldSchema.objects.filter(model_schema=schema, name=field_name).delete()
-
-        for field in self.data['fields']:
-            if field['name'] in fields_for_update:
-                instance = all_db_fields.get(name=field['name'])
-                instance.class_name = self.class_name_mapper(field['field_type'])
+            instance = db_fields[name]
+            if instance.class_name != class_name or instance.kwargs != field['args']:
+                instance.class_name = class_name
                 instance.kwargs = field['args']
-                instance.save()
-
-        for field in self.data['fields']:
-            if field['name'] in fields_for_creation:
-                FieldSchema.objects.create(
-                    model_schema=schema, name=field['name'],
-                    class_name=self.class_name_mapper(field['field_type']),
-                    kwargs=field['args']
-                )
+                updated_fields.append(instance)
+        return removed_fields, updated_fields, created_fields
+
+    def check_partitioning(self, schema):
+        """Raise `PartitioningError` when the update would change the partitioning or the partition column."""
+        if self.data.get('partitioning') != schema.partitioning:
+            raise PartitioningError('The partitioning of a table cannot be changed.')
+        if not schema.partitioning:
+            return
+        # the partition key of PostgreSQL cannot be dropped nor altered
+        column = schema.partitioning['column']
+        removed_fields, updated_fields, _ = self.field_changes(schema)
+        if any(field.name == column for field in [*removed_fields, *updated_fields]):
+            raise PartitioningError(f'The partition column cannot be removed or changed: {column}')
+
+    def rewrites_data(self, schema) -> bool:
+        """Whether the update changes a column type, which rewrites every row of the table."""
+        db_class_names = dict(schema.fields.values_list('name', 'class_name'))
+        return any(
+            field['name'] in db_class_names
+            and db_class_names[field['name']] != self.class_name_mapper(field['field_type'])
+            for field in self.data['fields']
+        )
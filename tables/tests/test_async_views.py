@@ -0,0 +1,88 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.async_views import AsyncTableInsertRowView, AsyncTableRowsView
+from tables.pagination import encode_cursor
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+factory = AsyncRequestFactory()
+
+
+class AsyncRowViewsTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        table_data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'vin', 'field_type': 'string', 'args': {'unique': True, 'null': True}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ]
+        }
+        response = client.post('/api/table', data=table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def call(self, view_class, method, data=None, query=None, table_name='cars'):
+        path = f'/api/table/{table_name}/rows'
+        if method == 'get':
+            request = factory.get(path, query or {})
+        else:
+            request = factory.post(path, data=json.dumps(data), content_type='application/json')
+        response = async_to_sync(view_class.as_view())(request, table_name=table_name)
+        return response.status_code, json.loads(response.content) if response.content else None
+
+    def test_insert_and_fetch(self):
+        code, body = self.call(AsyncTableInsertRowView, 'post', {'model': 'Camry', 'vin': 'A1', 'price': 100})
+        self.assertEqual(code, status.HTTP_201_CREATED)
+        code, body = self.call(AsyncTableRowsView, 'post', [{'model': 'Golf'}, {'model': 'Polo', 'vin': 'B2'}])
+        self.assertEqual(code, status.HTTP_201_CREATED)
+        self.assertEqual(len(body['ids']), 2)
+
+        code, body = self.call(AsyncTableRowsView, 'get')
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertEqual([row['model'] for row in body], ['Camry', 'Golf', 'Polo'])
+        self.assertEqual(body[0], {'id': body[0]['id'], 'model': 'Camry', 'vin': 'A1', 'price': 100.0})
+
+        code, body = self.call(AsyncTableRowsView, 'get', query={'limit': 2})
+        self.assertEqual([row['model'] for row in body['results']], ['Camry', 'Golf'])
+        code, body = self.call(AsyncTableRowsView, 'get', query={'limit': 2, 'after': body['next']})
+        self.assertEqual(([row['model'] for row in body['results']], body['next']), (['Polo'], None))
+
+        with self.settings(TABLES_ROWS_MAX_PAGE_SIZE=2):
+            code, body = self.call(AsyncTableRowsView, 'get')
+        self.assertEqual([row['model'] for row in body], ['Camry', 'Golf'])
+
+    def test_errors(self):
+        code, body = self.call(AsyncTableInsertRowView, 'post', {'price': 'cheap'})
+        self.assertEqual(code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(body), {'model', 'price'})
+
+        self.call(AsyncTableInsertRowView, 'post', {'model': 'Camry', 'vin': 'A1'})
+        code, body = self.call(AsyncTableRowsView, 'post', [{'model': 'Golf'}, {'model': 'Polo', 'vin': 'A1'}])
+        self.assertEqual(code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row['index'] for row in body['rows']], [1])
+
+        code, body = self.call(AsyncTableRowsView, 'get', query={'after': encode_cursor({'x': 1})})
+        self.assertEqual(code, status.HTTP_400_BAD_REQUEST)
+
+        code, body = self.call(AsyncTableRowsView, 'get', table_name='trucks')
+        self.assertEqual(code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_and_delete(self):
+        self.call(AsyncTableRowsView, 'post', [{'model': 'Golf', 'price': 50}, {'model': 'Polo', 'price': 70}])
+        request = factory.patch('/api/table/cars/rows?where.price__gt=60', data=json.dumps({'set': {'price': 65}}),
+                                content_type='application/json')
+        response = async_to_sync(AsyncTableRowsView.as_view())(request, table_name='cars')
+        self.assertEqual(json.loads(response.content), {'rows': 1, 'batches': 1})
+
+        request = factory.delete('/api/table/cars/rows?where.price__lt=60&batch_size=10')
+        response = async_to_sync(AsyncTableRowsView.as_view())(request, table_name='cars')
+        self.assertEqual(json.loads(response.content), {'rows': 1, 'batches': 1})
+        code, body = self.call(AsyncTableRowsView, 'get')
+        self.assertEqual([(row['model'], row['price']) for row in body], [('Polo', 65.0)])
@@ -0,0 +1,28 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+class BenchTablesCommandTestCase(TestCaseDynamicModels):
+    def test_json_report(self):
+        stdout = StringIO()
+        call_command(
+            'bench_tables', '--columns', '3', '--rows', '50', '--samples', '2', '--batch-size', '10',
+            '--host', 'testserver', stdout=stdout,
+        )
+        report = json.loads(stdout.getvalue())
+
+        self.assertEqual(len(report['benchmarks']), 1)
+        benchmark = report['benchmarks'][0]
+        self.assertEqual((benchmark['columns'], benchmark['rows']), (3, 50))
+        self.assertEqual(
+            set(benchmark['ddl_s']), {'create_table', 'add_column', 'alter_column_type', 'create_index', 'drop_table'}
+        )
+        self.assertEqual(benchmark['fetch']['random_page']['count'], 2)
+        self.assertGreater(benchmark['insert']['bulk']['rows_per_s'], 0)
+        # benchmark tables are dropped
+        self.assertFalse(ModelSchema.objects.exists())
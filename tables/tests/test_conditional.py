@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class ConditionalGetTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {'unique': True}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        client.post('/api/table/cars/rows', data=[{'model': 'Camry', 'price': 100}], format='json')
+        self.table = ModelSchema.objects.get(name='cars').table_name
+
+    def table_queries(self, queries):
+        return [query for query in queries if self.table in query['sql']]
+
+    def test_not_modified(self):
+        response = client.get('/api/table/cars/rows')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/table/cars/rows', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.table_queries(queries), [])
+
+        response = client.get('/api/table/cars/aggregate', {'count': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_etag(self):
+        etags = [client.get('/api/table/cars/rows')['ETag']]
+        for method, url, data in [
+            ('post', '/api/table/cars/row', {'model': 'Golf'}),
+            ('post', '/api/table/cars/rows', [{'model': 'Polo'}]),
+            ('patch', '/api/table/cars/rows?where.model=Golf', {'set': {'price': 50}}),
+            ('delete', '/api/table/cars/rows?where.model=Polo', None),
+            ('post', '/api/table/cars/upsert', {'on': ['model'], 'rows': [{'model': 'Golf', 'price': 60}]}),
+        ]:
+            response = getattr(client, method)(url, data=data, format='json')
+            self.assertLess(response.status_code, 300, response.content)
+
+            response = client.get('/api/table/cars/rows', HTTP_IF_NONE_MATCH=etags[-1])
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            etags.append(response['ETag'])
+        self.assertEqual(len(set(etags)), len(etags))
+        self.assertEqual(
+            sorted((row['model'], row['price']) for row in response.json()), [('Camry', 100), ('Golf', 60)]
+        )
+
+    @override_settings(TABLES_ROWS_CACHE='default')
+    def test_cached_bodies(self):
+        response = client.get('/api/table/cars/rows', {'fields': 'model'})
+        self.assertEqual(response.json(), [{'model': 'Camry'}])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/table/cars/rows', {'fields': 'model'})
+        self.assertEqual(response.json(), [{'model': 'Camry'}])
+        self.assertEqual(self.table_queries(queries), [])
+
+        # another query, then a new version
+        self.assertEqual(len(client.get('/api/table/cars/rows').json()[0]), 3)
+        client.post('/api/table/cars/row', data={'model': 'Golf'}, format='json')
+        response = client.get('/api/table/cars/rows', {'fields': 'model'})
+        self.assertEqual(response.json(), [{'model': 'Camry'}, {'model': 'Golf'}])
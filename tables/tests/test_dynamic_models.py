@@ -1,7 +1,12 @@
-from django.db import transaction, IntegrityError
+from django.apps import apps
+from django.db import connection, transaction, IntegrityError
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
+from tables.dynamic_models_cache import ModelCache
 from tables.models import ModelSchema, FieldSchema
-from .utils import TestCaseDynamicModels, all_dynamic_models_loaded
+from tables.table_editor import TableEditor
+from .utils import DEFAULT_DYNAMIC_MODELS_SET, TestCaseDynamicModels, all_dynamic_models_loaded
 
 
 class ModelSchemaTestCase(TestCaseDynamicModels):
@@ -65,3 +70,113 @@ class ModelSchemaTestCase(TestCaseDynamicModels):
             self.fail('Duplicate question allowed.')
         except IntegrityError:
             pass
+
+
+class ModelSchemaCacheTestCase(TestCaseDynamicModels):
+    def test_as_model_cached(self):
+        car_schema = ModelSchema.objects.create(name='Car')
+        FieldSchema.objects.create(model_schema=car_schema, name='model', class_name="django.db.models.TextField")
+
+        Car = car_schema.as_model()
+        with self.assertNumQueries(0):
+            self.assertIs(car_schema.as_model(), Car)
+
+        # other instances of the same schema version share the cached class
+        car_schema_copy = ModelSchema.objects.get(name='Car')
+        with self.assertNumQueries(0):
+            self.assertIs(car_schema_copy.as_model(), Car)
+
+    @override_settings(TABLES_MODEL_CACHE_SIZE=2)
+    def test_least_recently_used_models_evicted(self):
+        schemas = {}
+        for name in ['Car', 'Truck', 'Bike']:
+            schemas[name] = ModelSchema.objects.create(name=name)
+            FieldSchema.objects.create(model_schema=schemas[name], name='model', class_name="django.db.models.TextField")
+        ModelCache().clear()
+
+        Car = schemas['Car'].as_model()
+        schemas['Truck'].as_model()
+        # Car is used again, Truck becomes the least recently used model
+        self.assertIs(schemas['Car'].as_model(), Car)
+        Bike = schemas['Bike'].as_model()
+
+        self.assertEqual(len(ModelCache()), 2)
+        self.assertEqual(all_dynamic_models_loaded() - DEFAULT_DYNAMIC_MODELS_SET, {'car', 'bike'})
+        self.assertNotIn('truck', [model._meta.model_name for model in apps.get_models()])
+        self.assertIn(Bike, apps.get_models())
+
+        # an evicted model is rebuilt on its next use, also to alter its columns
+        field = schemas['Truck'].fields.get()
+        field.kwargs = {'null': True}
+        field.save()
+        self.assertTrue(schemas['Truck'].as_model()._meta.get_field('model').null)
+        self.assertEqual(len(ModelCache()), 2)
+
+    def test_version_bumped_on_schema_changes(self):
+        car_schema = ModelSchema.objects.create(name='Car')
+        version = car_schema.version
+
+        model_field = FieldSchema.objects.create(model_schema=car_schema, name='model', class_name="django.db.models.TextField")
+        self.assertGreater(car_schema.version, version)
+        version = car_schema.version
+        Car = car_schema.as_model()
+        self.assertEqual([f.name for f in Car._meta.fields], ['id', 'model'])
+
+        model_field.kwargs = {'null': True}
+        model_field.save()
+        self.assertGreater(car_schema.version, version)
+        version = car_schema.version
+        self.assertIsNot(car_schema.as_model(), Car)
+        self.assertTrue(car_schema.as_model()._meta.get_field('model').null)
+
+        model_field.delete()
+        self.assertGreater(car_schema.version, version)
+        self.assertEqual([f.name for f in car_schema.as_model()._meta.fields], ['id'])
+
+        car_schema.name = 'Truck'
+        car_schema.save()
+        self.assertEqual(ModelSchema.objects.get(name='Truck').version, car_schema.version)
+        self.assertEqual(car_schema.as_model()._meta.db_table, 'dt_truck')
+
+
+class ModelSchemaQueriesTestCase(TestCaseDynamicModels):
+    def create_schema(self, name, fields_count):
+        schema = ModelSchema.objects.create(name=name)
+        for i in range(fields_count):
+            FieldSchema.objects.create(model_schema=schema, name=f'field_{i}', class_name="django.db.models.TextField")
+        return schema
+
+    def test_build_model_in_constant_queries(self):
+        for name, fields_count in [('Small', 1), ('Large', 30)]:
+            self.create_schema(name, fields_count)
+            ModelCache().clear()
+
+            schema = ModelSchema.objects.get(name=name)
+            with self.assertNumQueries(1):
+                model = schema.as_model()
+            self.assertEqual(len(model._meta.fields), fields_count + 1)
+
+    def test_load_fields_in_constant_queries(self):
+        self.create_schema('Small', 1)
+        self.create_schema('Large', 30)
+
+        with self.assertNumQueries(1):
+            fields = list(FieldSchema.objects.all())
+        self.assertEqual(len(fields), 31)
+
+        with self.assertNumQueries(2):
+            schemas = list(ModelSchema.objects.prefetch_related('fields'))
+            self.assertEqual(sum(len(schema.fields.all()) for schema in schemas), 31)
+
+    def test_update_table_in_constant_queries(self):
+        queries_count = []
+        for name, fields_count in [('Small', 2), ('Large', 30)]:
+            self.create_schema(name, 1)
+            data = {
+                'name': name,
+                'fields': [{'name': f'field_{i}', 'field_type': 'string', 'args': {}} for i in range(fields_count)],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                TableEditor(data).update(name)
+            queries_count.append(len(queries))
+        self.assertEqual(queries_count[0], queries_count[1])
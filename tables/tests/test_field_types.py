@@ -0,0 +1,33 @@
+from django.db import models
+from django.test import SimpleTestCase
+
+from tables.exceptions import UnknownFieldTypeError
+from tables.field_types import FieldTypeRegistry, field_types
+from tables.models import FieldSchema, ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+class FieldTypeRegistryTestCase(SimpleTestCase):
+    def test_lookup(self):
+        self.assertEqual(field_types.get('string').class_name, 'django.db.models.TextField')
+        self.assertIs(field_types.get_by_class_name('django.db.models.FloatField').field_class, models.FloatField)
+        self.assertEqual(field_types.keys()[:3], ['string', 'number', 'boolean'])
+
+    def test_unregistered_classes_are_not_imported(self):
+        with self.assertRaises(UnknownFieldTypeError):
+            field_types.get('json')
+        with self.assertRaises(UnknownFieldTypeError):
+            field_types.get_by_class_name('django.contrib.auth.models.User')
+
+    def test_default_options(self):
+        registry = FieldTypeRegistry()
+        field_type = registry.register('flag', 'django.db.models.BooleanField', models.BooleanField, {'default': False})
+        self.assertIs(field_type.make_field({}).default, False)
+        self.assertIs(field_type.make_field({'default': True}).default, True)
+
+
+class FieldSchemaFieldTypeTestCase(TestCaseDynamicModels):
+    def test_unknown_class_name(self):
+        schema = ModelSchema.objects.create(name='cars')
+        with self.assertRaises(UnknownFieldTypeError):
+            FieldSchema.objects.create(model_schema=schema, name='owner', class_name='os.system')
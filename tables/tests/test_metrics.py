@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.metrics import MetricsRegistry, registry, timer
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class MetricsRegistryTestCase(SimpleTestCase):
+    def test_render(self):
+        metrics = MetricsRegistry()
+        metrics.increment('queries', 3, table='cars')
+        metrics.increment('queries', 2, table='cars')
+        metrics.observe('ddl', 0.5, operation='drop_table')
+        metrics.observe('ddl', 0.25, operation='drop_table')
+
+        self.assertEqual(metrics.render(), (
+            '# TYPE tables_queries_total counter\n'
+            'tables_queries_total{table="cars"} 5\n'
+            '# TYPE tables_ddl_seconds summary\n'
+            'tables_ddl_seconds_sum{operation="drop_table"} 0.750000000\n'
+            'tables_ddl_seconds_count{operation="drop_table"} 2\n'
+        ))
+
+    @override_settings(TABLES_METRICS=False)
+    def test_disabled(self):
+        registry.clear()
+        with timer('model'):
+            pass
+        self.assertEqual(registry.render(), '\n')
+
+
+@override_settings(TABLES_METRICS=True, TABLES_METRICS_SERVER_TIMING=True)
+class MetricsViewsTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        table_data = {'name': 'cars', 'fields': [{'name': 'model', 'field_type': 'string'}]}
+        response = client.post('/api/table', data=table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_row_views(self):
+        response = client.post('/api/table/cars/rows', data=[{'model': 'Camry'}, {'model': 'Golf'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = client.get('/api/table/cars/rows')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = dict(entry.split(';dur=') for entry in response['Server-Timing'].split(', '))
+        self.assertLessEqual({'model', 'view', 'sql'}, timings.keys())
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        metrics = response.content.decode()
+        self.assertIn('tables_rows_total{operation="insert",table="cars"} 2\n', metrics)
+        self.assertIn('tables_rows_total{operation="fetch",table="cars"} 2\n', metrics)
+        self.assertIn('tables_queries_total{table="cars"}', metrics)
+        self.assertIn('tables_view_seconds_count{method="GET",view="TableRowsAPIView"} 1\n', metrics)
+        self.assertIn('tables_ddl_seconds_count{operation="create_table"} 1\n', metrics)
+        self.assertIn('tables_model_cache_total{result="hit"}', metrics)
+
+    def test_unknown_tables_are_not_labels(self):
+        response = client.get('/api/table/no_such_table/rows')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        metrics = client.get('/metrics').content.decode()
+        self.assertNotIn('no_such_table', metrics)
+        self.assertIn('tables_view_seconds_count{method="GET",view="TableRowsAPIView"} 1\n', metrics)
+
+    @override_settings(TABLES_METRICS=False)
+    def test_metrics_disabled(self):
+        response = client.get('/api/table/cars/rows')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(client.get('/metrics').status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.db import DatabaseError, OperationalError, connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tables.models import ModelSchema
+from tables.online_schema import LOCK_NOT_AVAILABLE, lock_timeout, retry_on_lock_timeout
+from tables.table_editor import TableEditor
+from .utils import TestCaseDynamicModels
+
+
+class LockNotAvailable(Exception):
+    pgcode = LOCK_NOT_AVAILABLE
+
+
+def lock_not_available_error():
+    error = OperationalError('canceling statement due to lock timeout')
+    error.__cause__ = LockNotAvailable()
+    return error
+
+
+@override_settings(TABLES_DDL_LOCK_RETRIES=2, TABLES_DDL_LOCK_RETRY_BACKOFF=0)
+class RetryOnLockTimeoutTestCase(SimpleTestCase):
+    def test_retry(self):
+        func = mock.Mock(side_effect=[lock_not_available_error(), lock_not_available_error(), 'done'])
+        self.assertEqual(retry_on_lock_timeout(func), 'done')
+        self.assertEqual(func.call_count, 3)
+
+    def test_give_up(self):
+        func = mock.Mock(side_effect=lock_not_available_error())
+        with self.assertRaises(OperationalError):
+            retry_on_lock_timeout(func)
+        self.assertEqual(func.call_count, 3)
+
+    def test_other_errors_not_retried(self):
+        func = mock.Mock(side_effect=OperationalError('connection lost'))
+        with self.assertRaises(OperationalError):
+            retry_on_lock_timeout(func)
+        self.assertEqual(func.call_count, 1)
+
+
+@override_settings(TABLES_ONLINE_SCHEMA_CHANGES=True, TABLES_BACKFILL_BATCH_SIZE=2)
+class OnlineSchemaChangesTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ],
+        }
+        TableEditor(self.data).create()
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        for i in range(5):
+            Car.objects.create(model=f'model {i}', price=i + 0.5)
+
+    def get_columns(self, table='dt_cars'):
+        with connection.cursor() as cursor:
+            return {
+                column.name: column.null_ok
+                for column in connection.introspection.get_table_description(cursor, table)
+            }
+
+    def get_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tgname FROM pg_trigger WHERE tgrelid = 'dt_cars'::regclass AND NOT tgisinternal")
+            return cursor.fetchall()
+
+    def test_lock_timeout(self):
+        with lock_timeout(), connection.cursor() as cursor:
+            cursor.execute('SHOW lock_timeout')
+            self.assertEqual(cursor.fetchone()[0], '2s')
+
+    def test_column_type_rewrite(self):
+        self.data['fields'][1] = {'name': 'price', 'field_type': 'string', 'args': {'null': True, 'db_index': True}}
+        self.data['indexes'] = [{'columns': ['model', 'price']}]
+        progress = mock.Mock()
+
+        TableEditor(self.data).update('cars', progress=progress)
+
+        self.assertEqual([call.args[0] for call in progress.call_args_list], [0.4, 0.8, 1.0])
+        self.assertEqual(self.get_columns(), {'id': False, 'model': False, 'price': True})
+        self.assertEqual(self.get_triggers(), [])
+
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        self.assertEqual(list(Car.objects.order_by('id').values_list('price', flat=True)),
+                         ['0.5', '1.5', '2.5', '3.5', '4.5'])
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'dt_cars')
+        self.assertEqual(
+            sorted(constraint['columns'] for constraint in constraints.values() if constraint['index']),
+            [['model', 'price'], ['price'], ['price']],
+        )
+
+    def test_backfill_sparse_ids(self):
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        Car.objects.create(id=10 ** 9, model='model 5', price=5.5)
+        self.data['fields'][1] = {'name': 'price', 'field_type': 'string', 'args': {'null': True}}
+        progress = mock.Mock()
+
+        with CaptureQueriesContext(connection) as queries:
+            TableEditor(self.data).update('cars', progress=progress)
+
+        backfills = [query for query in queries if query['sql'].startswith('UPDATE "dt_cars" SET "price__new"')]
+        self.assertEqual(len(backfills), 3)
+        self.assertEqual(progress.call_args_list[-1].args[0], 1.0)
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        self.assertEqual(Car.objects.get(id=10 ** 9).price, '5.5')
+
+    def test_failed_rewrite_is_cleaned_up(self):
+        self.data['fields'][1] = {'name': 'price', 'field_type': 'boolean', 'args': {'null': True}}
+
+        with self.assertRaises(DatabaseError):
+            TableEditor(self.data).update('cars')
+
+        self.assertEqual(self.get_columns(), {'id': False, 'model': False, 'price': True})
+        self.assertEqual(self.get_triggers(), [])
+        schema = ModelSchema.objects.get(name='cars')
+        self.assertEqual(schema.fields.get(name='price').class_name, 'django.db.models.FloatField')
+
+    def get_indexes(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'dt_cars')
+        return sorted(
+            (constraint['columns'], constraint['unique']) for name, constraint in constraints.items()
+            if (constraint['index'] or constraint['unique']) and not constraint['primary_key']
+        )
+
+    def test_rewrite_keeps_existing_indexes(self):
+        self.data['indexes'] = [
+            {'columns': ['model', 'price']},
+            {'columns': ['model'], 'where': {'price__gt': 1}},
+            {'columns': ['price', 'model'], 'unique': True},
+        ]
+        TableEditor(self.data).update('cars')
+        indexes = self.get_indexes()
+        self.assertEqual(len(indexes), 3)
+
+        self.data['fields'][1]['field_type'] = 'string'
+        TableEditor(self.data).update('cars')
+        self.assertEqual(self.get_indexes(), indexes)
+
+    def test_failed_rewrite_keeps_dropped_indexes(self):
+        self.data['indexes'] = [{'columns': ['model']}]
+        TableEditor(self.data).update('cars')
+
+        self.data['indexes'] = []
+        self.data['fields'][1] = {'name': 'price', 'field_type': 'boolean', 'args': {'null': True}}
+        with self.assertRaises(DatabaseError):
+            TableEditor(self.data).update('cars')
+        self.assertEqual(self.get_indexes(), [(['model'], False)])
+        self.assertEqual(len(ModelSchema.objects.get(name='cars').indexes), 1)
@@ -0,0 +1,224 @@
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from tables.partitioning import Partitioning, get_partitioning
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+def partition_names(table_name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass ORDER BY child.relname',
+            [table_name],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PartitioningTestCase(TestCaseDynamicModels):
+    def create_events(self, partitioning, indexes=()):
+        response = client.post('/api/table', data={
+            'name': 'events',
+            'fields': [
+                {'name': 'created_at', 'field_type': 'datetime'},
+                {'name': 'kind', 'field_type': 'string'},
+                {'name': 'amount', 'field_type': 'number', 'args': {'null': True}},
+            ],
+            'indexes': list(indexes),
+            'partitioning': partitioning,
+        }, format='json')
+        return response
+
+    def test_range_partitioning(self):
+        response = self.create_events(
+            {'method': 'range', 'column': 'created_at', 'interval': 'month', 'premake': 2},
+            indexes=[{'columns': ['kind']}],
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+        schema = ModelSchema.objects.get(name='events')
+        table = schema.table_name
+        # the default partition, the current month and two months ahead
+        self.assertEqual(len(partition_names(table)), 4)
+        self.assertIn(f'{table}_default', partition_names(table))
+
+        now = datetime.now(timezone.utc).isoformat()
+        response = client.post('/api/table/events/row', data={'created_at': now, 'kind': 'click'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = client.post('/api/table/events/rows', data=[
+            {'created_at': '2001-01-01T00:00:00Z', 'kind': 'view', 'amount': 1.5},
+            {'created_at': now, 'kind': 'view'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = response.json()['ids']
+        self.assertEqual(len(set(ids)), 2)
+
+        response = client.get('/api/table/events/rows', {'where.kind': 'view'})
+        self.assertEqual(sorted(row['id'] for row in response.json()), ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{table}_default"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_maintain_partitions(self):
+        self.create_events({'method': 'range', 'column': 'created_at', 'interval': 'day', 'premake': 1,
+                            'retention': 2})
+        schema = ModelSchema.objects.get(name='events')
+        partitioning = get_partitioning(schema.as_model())
+        initial = [name for name, _, _ in partitioning.get_partitions()]
+        self.assertEqual(len(initial), 2)
+
+        # nothing is missing yet
+        out = StringIO()
+        call_command('maintain_partitions', 'events', stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+        later = partitioning.shift(partitioning.get_current_start(), 3)
+        created, dropped = partitioning.maintain(now=later)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(dropped, initial[:1])
+        self.assertEqual([name for name, _, _ in partitioning.get_partitions()], [*initial[1:], *created])
+
+    def test_dropped_partitions_change_etag(self):
+        self.create_events({'method': 'range', 'column': 'created_at', 'interval': 'day', 'premake': 1,
+                            'retention': 2})
+        schema = ModelSchema.objects.get(name='events')
+        partitioning = get_partitioning(schema.as_model())
+        start = partitioning.shift(partitioning.get_current_start(), -10)
+        with connection.schema_editor() as editor:
+            expired = partitioning.create_partitions(editor, [(start, partitioning.shift(start, 1))])
+        etag = client.get('/api/table/events/rows')['ETag']
+
+        out = StringIO()
+        call_command('maintain_partitions', stdout=out)
+        self.assertEqual(out.getvalue(), f'events: dropped {expired[0]}\n')
+        response = client.get('/api/table/events/rows', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_maintain_number_partitions(self):
+        response = client.post('/api/table', data={
+            'name': 'readings',
+            'fields': [{'name': 'seq', 'field_type': 'number'}],
+            'partitioning': {'method': 'range', 'column': 'seq', 'interval': 10, 'premake': 1},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+        schema = ModelSchema.objects.get(name='readings')
+        partitioning = get_partitioning(schema.as_model())
+        self.assertEqual([(lower, upper) for _, lower, upper in partitioning.get_partitions()], [(0, 10), (10, 20)])
+
+        # 25 is beyond the premade partitions and lands in the default one
+        response = client.post('/api/table/readings/rows', data=[{'seq': 15}, {'seq': 25}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(partitioning.get_current_start(), 10)
+        with self.assertLogs('tables.partitioning', 'WARNING'):
+            self.assertEqual(partitioning.maintain(), ([], []))
+
+        response = client.post('/api/table/readings/rows', data=[{'seq': 19}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(client.get('/api/table/readings/rows', {'order_by': 'seq'}).json()[-1]['seq'], 25)
+
+    def test_maintain_partitions_continues_after_errors(self):
+        self.create_events({'method': 'range', 'column': 'created_at', 'interval': 'day', 'premake': 1})
+        response = client.post('/api/table', data={
+            'name': 'readings',
+            'fields': [{'name': 'seq', 'field_type': 'number'}],
+            'partitioning': {'method': 'range', 'column': 'seq', 'interval': 10},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+
+        err = StringIO()
+        with mock.patch.object(Partitioning, 'maintain', side_effect=[DatabaseError('boom'), ([], [])]) as maintain:
+            with self.assertRaisesMessage(CommandError, 'Failed to maintain: '):
+                call_command('maintain_partitions', stdout=StringIO(), stderr=err)
+        self.assertEqual(maintain.call_count, 2)
+        self.assertIn(': failed, boom', err.getvalue())
+
+    def test_rename_partitioned_table(self):
+        self.create_events({'method': 'range', 'column': 'created_at', 'interval': 'day', 'premake': 1})
+        response = client.put('/api/table/events', data={
+            'name': 'events2',
+            'fields': [
+                {'name': 'created_at', 'field_type': 'datetime'},
+                {'name': 'kind', 'field_type': 'string'},
+                {'name': 'amount', 'field_type': 'number', 'args': {'null': True}},
+            ],
+            'partitioning': {'method': 'range', 'column': 'created_at', 'interval': 'day', 'premake': 1},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        table = ModelSchema.objects.get(name='events2').table_name
+        self.assertTrue(all(name.startswith(f'{table}_') for name in partition_names(table)))
+
+        partitioning = get_partitioning(ModelSchema.objects.get(name='events2').as_model())
+        created, _ = partitioning.maintain(now=partitioning.shift(partitioning.get_current_start(), 3))
+        self.assertEqual(len(created), 2)
+        response = client.post('/api/table/events2/row', data={'created_at': datetime.now(timezone.utc).isoformat(),
+                                                               'kind': 'click'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # the old names are free again
+        response = self.create_events({'method': 'range', 'column': 'created_at', 'interval': 'day'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+
+    def test_hash_partitioning(self):
+        response = self.create_events({'method': 'hash', 'column': 'kind', 'partitions': 4})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+        schema = ModelSchema.objects.get(name='events')
+        self.assertEqual(partition_names(schema.table_name), [f'{schema.table_name}_p{i}' for i in range(4)])
+
+        response = client.post('/api/table/events/rows', data=[
+            {'created_at': '2001-01-01T00:00:00Z', 'kind': kind} for kind in 'abcdefgh'
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = client.get('/api/table/events/rows', {'order_by': 'kind'})
+        self.assertEqual([row['kind'] for row in response.json()], list('abcdefgh'))
+
+    def test_invalid_partitioning(self):
+        for partitioning in [
+            {'method': 'range', 'column': 'missing', 'interval': 'day'},
+            {'method': 'range', 'column': 'amount', 'interval': 10},
+            {'method': 'range', 'column': 'created_at', 'interval': 10},
+            {'method': 'range', 'column': 'kind', 'interval': 'day'},
+            {'method': 'range', 'column': 'created_at'},
+            {'method': 'hash', 'column': 'kind'},
+        ]:
+            with self.subTest(partitioning=partitioning):
+                response = self.create_events(partitioning)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.create_events({'method': 'hash', 'column': 'kind', 'partitions': 2},
+                                      indexes=[{'columns': ['amount'], 'unique': True}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ModelSchema.objects.exists())
+
+    def test_partition_column_cannot_change(self):
+        partitioning = {'method': 'hash', 'column': 'kind', 'partitions': 2}
+        self.create_events(partitioning)
+        data = {
+            'name': 'events',
+            'fields': [
+                {'name': 'created_at', 'field_type': 'datetime'},
+                {'name': 'amount', 'field_type': 'number', 'args': {'null': True}},
+            ],
+            'partitioning': partitioning,
+        }
+        response = client.put('/api/table/events', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data['fields'].append({'name': 'kind', 'field_type': 'string'})
+        data['partitioning'] = None
+        response = client.put('/api/table/events', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # other columns can be changed
+        data['partitioning'] = partitioning
+        data['fields'][1]['field_type'] = 'string'
+        response = client.put('/api/table/events', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
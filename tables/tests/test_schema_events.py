@@ -0,0 +1,91 @@
+import json
+import time
+from unittest import mock
+
+import psycopg2
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tables.constants import SCHEMA_CHANGES_CHANNEL
+from tables.dynamic_models_cache import ModelCache
+from tables.models import ModelSchema, FieldSchema
+from tables import schema_events
+from tables.schema_events import SchemaChangeListener, handle_schema_change, listener_running, start_listener
+from .utils import TestCaseDynamicModels, all_dynamic_models_loaded
+
+
+class SchemaEventsTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.car_schema = ModelSchema.objects.create(name='Car')
+        FieldSchema.objects.create(model_schema=self.car_schema, name='model', class_name="django.db.models.TextField")
+        self.car_schema.as_model()
+
+    def test_publish_on_version_bump(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.car_schema.bump_version()
+        self.assertTrue(any('pg_notify' in query['sql'] for query in queries.captured_queries))
+
+    def test_handle_schema_change(self):
+        cache = ModelCache()
+
+        # own or older changes are ignored
+        handle_schema_change(json.dumps({'pk': self.car_schema.pk, 'version': self.car_schema.version}))
+        self.assertIsNotNone(cache.get(self.car_schema.pk, self.car_schema.version))
+        self.assertIn('car', all_dynamic_models_loaded())
+
+        handle_schema_change(json.dumps({'pk': self.car_schema.pk, 'version': self.car_schema.version + 1}))
+        self.assertIsNone(cache.get(self.car_schema.pk, self.car_schema.version))
+        self.assertNotIn('car', all_dynamic_models_loaded())
+
+    def test_listener(self):
+        listener = SchemaChangeListener(poll_timeout=0.1)
+        listener.start()
+        try:
+            self.assertTrue(listener.listening.wait(5))
+
+            payload = json.dumps({'pk': self.car_schema.pk, 'version': self.car_schema.version + 1})
+            notifier = psycopg2.connect(**connection.get_connection_params())
+            notifier.set_session(autocommit=True)
+            with notifier.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [SCHEMA_CHANGES_CHANNEL, payload])
+            notifier.close()
+
+            deadline = time.monotonic() + 5
+            while ModelCache().get(self.car_schema.pk, self.car_schema.version) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertIsNone(ModelCache().get(self.car_schema.pk, self.car_schema.version))
+        finally:
+            listener.stop()
+            listener.join()
+
+
+@mock.patch.object(schema_events, '_listener', None)
+@mock.patch.object(schema_events, '_fork_hook_registered', False)
+@mock.patch('tables.schema_events.os.register_at_fork')
+@mock.patch('tables.schema_events.SchemaChangeListener')
+class StartListenerTestCase(SimpleTestCase):
+    def test_disabled(self, listener_class, register_at_fork):
+        self.assertIsNone(start_listener())
+        listener_class.assert_not_called()
+        self.assertFalse(listener_running())
+
+    @override_settings(TABLES_SCHEMA_LISTENER=True)
+    def test_started_once_per_process(self, listener_class, register_at_fork):
+        listener = start_listener()
+        listener.start.assert_called_once_with()
+        listener.is_alive.return_value = True
+        self.assertIs(start_listener(), listener)
+        register_at_fork.assert_called_once()
+
+        listener.listening.is_set.return_value = False
+        self.assertFalse(listener_running())
+        listener.listening.is_set.return_value = True
+        self.assertTrue(listener_running())
+
+        # a forked worker starts its own listener
+        listener_class.return_value = mock.Mock()
+        register_at_fork.call_args.kwargs['after_in_child']()
+        self.assertIsNot(schema_events._listener, listener)
+        schema_events._listener.start.assert_called_once_with()
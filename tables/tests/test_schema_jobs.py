@@ -0,0 +1,125 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema, SchemaChangeJob
+from tables.schema_jobs import Heartbeat, claim_next_job, fail_stale_jobs, run_job
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+@override_settings(TABLES_ASYNC_SCHEMA_CHANGES=True)
+class SchemaChangeJobTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.table_data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ]
+        }
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        Car.objects.create(model='Camry', price=100)
+
+    def test_type_change_is_queued(self):
+        self.table_data['fields'][1]['field_type'] = 'string'
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_url = response.json()['url']
+        self.assertEqual(response['Location'], job_url)
+
+        response = client.get(job_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(response.json()['table'], 'cars')
+
+        # the table is unchanged until the job runs, further updates are rejected
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        self.assertEqual(Car._meta.get_field('price').get_internal_type(), 'FloatField')
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        call_command('run_schema_jobs', '--once', stdout=StringIO())
+
+        data = client.get(job_url).json()
+        self.assertEqual((data['status'], data['progress'], data['error']), ('succeeded', 1, ''))
+        self.assertIsNotNone(data['finished_at'])
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        self.assertEqual(list(Car.objects.values_list('price', flat=True)), ['100'])
+
+    def test_failed_job(self):
+        self.table_data['fields'][1]['field_type'] = 'string'
+        self.table_data['fields'][1]['args'] = {}
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        with self.assertLogs('tables.schema_jobs', 'ERROR'):
+            call_command('run_schema_jobs', '--once', stdout=StringIO())
+
+        job = SchemaChangeJob.objects.get()
+        self.assertEqual(job.status, SchemaChangeJob.FAILED)
+        self.assertIn('NOT NULL', job.error)
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        self.assertEqual(Car._meta.get_field('price').get_internal_type(), 'FloatField')
+
+    def test_stale_running_job(self):
+        self.table_data['fields'][1]['field_type'] = 'string'
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # a long job of a live runner keeps reporting
+        long_ago = timezone.now() - timedelta(hours=2)
+        SchemaChangeJob.objects.update(status=SchemaChangeJob.RUNNING, started_at=long_ago, heartbeat_at=timezone.now())
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # its runner died
+        SchemaChangeJob.objects.update(heartbeat_at=long_ago)
+        with self.assertLogs('tables.schema_jobs', 'WARNING'):
+            response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        stale = SchemaChangeJob.objects.order_by('pk').first()
+        self.assertEqual(stale.status, SchemaChangeJob.FAILED)
+        self.assertIsNotNone(stale.finished_at)
+
+    def test_job_failed_as_stale_keeps_its_status(self):
+        self.table_data['fields'][1]['field_type'] = 'string'
+        client.put('/api/table/cars', data=self.table_data, format='json')
+        job = claim_next_job()
+        self.assertIsNotNone(job.heartbeat_at)
+        SchemaChangeJob.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('tables.schema_jobs', 'WARNING'):
+            fail_stale_jobs()
+            job = run_job(job)
+        self.assertEqual(job.status, SchemaChangeJob.FAILED)
+        self.assertEqual(SchemaChangeJob.objects.get().status, SchemaChangeJob.FAILED)
+
+    @mock.patch('tables.schema_jobs.touch_job')
+    def test_heartbeat(self, touch_job):
+        heartbeat = Heartbeat(1234, 0.01)
+        heartbeat.start()
+        time.sleep(0.1)
+        heartbeat.stop()
+        self.assertFalse(heartbeat.is_alive())
+        touch_job.assert_called_with(1234)
+
+    def test_changes_without_rewrite_are_applied_directly(self):
+        self.table_data['fields'].append({'name': 'color', 'field_type': 'string', 'args': {'null': True}})
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(SchemaChangeJob.objects.exists())
+
+    def test_unknown_job(self):
+        response = client.get('/api/job/1234')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,70 @@
+import datetime
+import gc
+import weakref
+
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from django.utils import timezone
+
+from tables.dynamic_models_cache import ModelCache
+from tables.models import ModelSchema, FieldSchema
+from tables.serializers import dynamic_serializer_for_model, row_encoder_for_model
+from .utils import TestCaseDynamicModels
+
+
+class DynamicSerializersTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.car_schema = ModelSchema.objects.create(name='Car')
+        FieldSchema.objects.create(model_schema=self.car_schema, name='model', class_name="django.db.models.TextField")
+        FieldSchema.objects.create(model_schema=self.car_schema, name='year', kwargs={'null': True},
+                                   class_name="django.db.models.IntegerField")
+        FieldSchema.objects.create(model_schema=self.car_schema, name='sold_at', kwargs={'null': True},
+                                   class_name="django.db.models.DateTimeField")
+
+    def test_serializer_cached_per_model(self):
+        Car = self.car_schema.as_model()
+        serializer_class = dynamic_serializer_for_model(Car)
+        self.assertIs(dynamic_serializer_for_model(Car), serializer_class)
+
+        FieldSchema.objects.create(model_schema=self.car_schema, name='color', kwargs={'null': True},
+                                   class_name="django.db.models.TextField")
+        NewCar = self.car_schema.as_model()
+        self.assertIsNot(dynamic_serializer_for_model(NewCar), serializer_class)
+        self.assertIn('color', dynamic_serializer_for_model(NewCar)().fields)
+
+    @override_settings(TABLES_MODEL_CACHE_SIZE=1)
+    def test_evicted_models_are_released(self):
+        Car = self.car_schema.as_model()
+        dynamic_serializer_for_model(Car)
+        row_encoder_for_model(Car)
+        row_encoder_for_model(Car, ('model',))
+        car_ref = weakref.ref(Car)
+        del Car
+
+        truck_schema = ModelSchema.objects.create(name='Truck')
+        FieldSchema.objects.create(model_schema=truck_schema, name='model', class_name="django.db.models.TextField")
+        truck_schema.as_model()
+        self.assertEqual(len(ModelCache()), 1)
+        gc.collect()
+        self.assertIsNone(car_ref())
+
+    def test_row_encoder_matches_serializer(self):
+        Car = self.car_schema.as_model()
+        Car.objects.create(model='Camry', year=1997, sold_at=timezone.make_aware(datetime.datetime(2001, 2, 3, 4, 5)))
+        Car.objects.create(model='Corolla')
+
+        queryset = Car.objects.order_by('id')
+        expected = dynamic_serializer_for_model(Car)(queryset, many=True).data
+
+        with self.assertNumQueries(1):
+            rows = row_encoder_for_model(Car).encode_rows(queryset)
+        self.assertEqual(rows, expected)
+        self.assertEqual(rows[0]['sold_at'], '2001-02-03T04:05:00Z')
+
+        # async reads fetch `values()` dicts with `aiterator()`
+        rows = async_to_sync(row_encoder_for_model(Car).aencode_rows)(queryset)
+        self.assertEqual(rows, expected)
+        self.assertEqual(list(rows[0]), ['id', 'model', 'year', 'sold_at'])
+        projected = async_to_sync(row_encoder_for_model(Car, ('sold_at', 'model')).aencode_rows)(queryset)
+        self.assertEqual(projected[0], {'sold_at': '2001-02-03T04:05:00Z', 'model': 'Camry'})
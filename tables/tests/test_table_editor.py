@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tables.exceptions import NullFieldChangedError
+from tables.models import ModelSchema
+from tables.table_editor import TableEditor
+from .utils import TestCaseDynamicModels
+
+
+class TableEditorUpdateTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+                {'name': 'color', 'field_type': 'string', 'args': {'null': True}},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'null': True}},
+            ]
+        }
+        TableEditor(self.data).create()
+
+    def test_update_in_single_alter_table(self):
+        data = {
+            'name': 'vehicles',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {}},
+                {'name': 'price', 'field_type': 'string', 'args': {'null': True}},
+                {'name': 'wheels', 'field_type': 'number', 'args': {'default': 4}},
+                {'name': 'owner', 'field_type': 'string', 'args': {'default': 'nobody'}},
+                {'name': 'note', 'field_type': 'string', 'args': {'null': True}},
+            ]
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            TableEditor(data).update('cars')
+
+        add_drop_statements = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('ALTER TABLE') and ' COLUMN ' in query['sql'] and 'ALTER COLUMN' not in query['sql']
+        ]
+        self.assertEqual(len(add_drop_statements), 1)
+        for column in ['color', 'sold']:
+            self.assertIn(f'DROP COLUMN "{column}"', add_drop_statements[0])
+        for column in ['wheels', 'owner', 'note']:
+            self.assertIn(f'ADD COLUMN "{column}"', add_drop_statements[0])
+
+        schema = ModelSchema.objects.get(name='vehicles')
+        Vehicle = schema.as_model()
+        self.assertEqual(Vehicle._meta.db_table, 'dt_vehicles')
+        self.assertEqual(
+            [f.name for f in Vehicle._meta.fields], ['id', 'model', 'price', 'wheels', 'owner', 'note']
+        )
+
+        # the table matches the model, defaults are not kept in the database
+        vehicle = Vehicle.objects.create(model='Camry', price='cheap')
+        vehicle.refresh_from_db()
+        self.assertEqual((vehicle.price, vehicle.wheels, vehicle.owner), ('cheap', 4, 'nobody'))
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(cursor, 'dt_vehicles')
+        self.assertEqual([column.name for column in columns], ['id', 'model', 'price', 'wheels', 'owner', 'note'])
+        self.assertTrue(all(column.default is None for column in columns))
+
+    def test_update_is_atomic(self):
+        data = {
+            'name': 'vehicles',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': False}},
+                {'name': 'wheels', 'field_type': 'number', 'args': {'null': True}},
+            ]
+        }
+
+        with self.assertRaises(NullFieldChangedError):
+            TableEditor(data).update('cars')
+
+        schema = ModelSchema.objects.get(name='cars')
+        self.assertEqual(sorted(schema.fields.values_list('name', flat=True)), ['color', 'model', 'price', 'sold'])
+        self.assertEqual([f.name for f in schema.as_model()._meta.fields], ['id', 'model', 'price', 'color', 'sold'])
@@ -0,0 +1,77 @@
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableAggregateTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        table_data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'default': False}},
+            ]
+        }
+        response = client.post('/api/table', data=table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        Car.objects.bulk_create([
+            Car(model='Camry', price=100, sold=True),
+            Car(model='Camry', price=200),
+            Car(model='Golf', price=50, sold=True),
+            Car(model='Golf', price=None),
+            Car(model='Polo', price=70),
+        ])
+
+    def aggregate(self, **params):
+        return client.get('/api/table/cars/aggregate', params)
+
+    def test_group_by(self):
+        response = self.aggregate(group_by='model', count=1, sum='price', avg='price', max='price,model')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [
+            {'group': {'model': 'Camry'}, 'count': 2, 'sum': {'price': 300.0}, 'avg': {'price': 150.0},
+             'max': {'price': 200.0, 'model': 'Camry'}},
+            {'group': {'model': 'Golf'}, 'count': 2, 'sum': {'price': 50.0}, 'avg': {'price': 50.0},
+             'max': {'price': 50.0, 'model': 'Golf'}},
+            {'group': {'model': 'Polo'}, 'count': 1, 'sum': {'price': 70.0}, 'avg': {'price': 70.0},
+             'max': {'price': 70.0, 'model': 'Polo'}},
+        ])
+
+    def test_whole_table_with_filters(self):
+        response = self.aggregate(**{'count': 'true', 'min': 'price', 'where.sold': 'false', 'where.price__isnull': 'false'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [{'count': 2, 'min': {'price': 70.0}}])
+
+        response = self.aggregate(**{'group_by': 'sold', 'count': 1, 'where.model__in': 'Golf,Polo'})
+        self.assertEqual(response.json()['results'], [
+            {'group': {'sold': False}, 'count': 2},
+            {'group': {'sold': True}, 'count': 1},
+        ])
+
+    def test_invalid_params(self):
+        response = self.aggregate(group_by='model')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.json())
+
+        response = self.aggregate(sum='model,color', max='sold')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'sum', 'max'})
+
+        response = self.aggregate(**{'count': 1, 'where.price__gt': 'cheap', 'where.sold__contains': 't', 'where.color': 'red'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'where.price__gt': ['“cheap” value must be a float.'],
+            'where.sold__contains': ['Lookup contains is supported only by text columns.'],
+            'where.color': ['Unknown column: color'],
+        })
+
+        response = client.get('/api/table/trucks/aggregate', {'count': 1})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,60 @@
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableBulkInsertTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.url = '/api/table/cars/rows'
+        self.model = ModelSchema.objects.get(name='cars').as_model()
+
+    def test_bulk_insert(self):
+        rows = [{'model': f'model {i}', 'price': i * 10} for i in range(25)]
+
+        with self.settings(TABLES_BULK_INSERT_BATCH_SIZE=10):
+            response = client.post(self.url, data=rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {'ids': list(range(1, 26))})
+        self.assertEqual(self.model.objects.count(), 25)
+        self.assertEqual(self.model.objects.get(pk=3).price, 20)
+
+    def test_bulk_insert_invalid_rows(self):
+        rows = [{'model': 'ok'}, {'price': 1}, {'model': 'ok'}, {'model': 'ok', 'price': 'expensive'}]
+
+        response = client.post(self.url, data=rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'rows': [
+            {'index': 1, 'errors': {'model': ['This field is required.']}},
+            {'index': 3, 'errors': {'price': ['A valid number is required.']}},
+        ]})
+        self.assertEqual(self.model.objects.count(), 0)
+
+    def test_bulk_insert_invalid_payload(self):
+        response = client.post(self.url, data={'model': 'not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'non_field_errors': ['Expected a list of items but got type "dict".']})
+
+        response = client.post(self.url, data=[], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'non_field_errors': ['This list may not be empty.']})
+
+        with self.settings(TABLES_BULK_INSERT_MAX_ROWS=2):
+            response = client.post(self.url, data=[{'model': 'a'}] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'non_field_errors': ['Ensure this field has no more than 2 elements.']})
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.dynamic_models_cache import SchemaDescriptionCache
+from tables.models import ModelSchema
+from tables.schema_events import handle_schema_change
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+def listener_running():
+    return mock.patch('tables.schema_description.listener_running', return_value=True)
+
+
+class TableDescribeTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        SchemaDescriptionCache().clear()
+        self.table_data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string', 'args': {'unique': True}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ],
+            'indexes': [{'columns': ['price'], 'method': 'brin'}],
+        }
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_describe(self):
+        response = client.get('/api/table/cars')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['name'], 'cars')
+        self.assertEqual(data['fields'], self.table_data['fields'])
+        self.assertEqual([index['columns'] for index in data['indexes']], [['price']])
+        self.assertEqual(data['indexes'][0]['method'], 'brin')
+        self.assertIsNone(data['partitioning'])
+        self.assertIn('row_estimate', data)
+
+        # the description can be sent back unchanged
+        response = client.put('/api/table/cars', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(client.get('/api/table/missing').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get('/api/table').status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_cached_description(self):
+        etag = client.get('/api/table/cars')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/table/cars')
+        self.assertEqual(response.json()['name'], 'cars')
+        # the schema version is checked
+        self.assertEqual(len(queries), 1)
+
+        with listener_running(), CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/table/cars', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+
+        self.table_data['fields'].append({'name': 'color', 'field_type': 'string', 'args': {'null': True}})
+        client.put('/api/table/cars', data=self.table_data, format='json')
+        response = client.get('/api/table/cars', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([field['name'] for field in response.json()['fields']], ['model', 'price', 'color'])
+
+    @mock.patch('tables.schema_description.listener_running', return_value=True)
+    def test_changes_of_other_workers(self, _):
+        client.get('/api/table/cars')
+        schema = ModelSchema.objects.get(name='cars')
+        # a change made by another worker, seen only through its notification
+        ModelSchema.objects.filter(pk=schema.pk).update(version=schema.version + 1, indexes=[])
+        self.assertEqual(len(client.get('/api/table/cars').json()['indexes']), 1)
+
+        handle_schema_change(f'{{"pk": {schema.pk}, "version": {schema.version + 1}}}')
+        self.assertEqual(client.get('/api/table/cars').json()['indexes'], [])
+
+    def test_renamed_and_deleted(self):
+        client.get('/api/table/cars')
+        self.table_data['name'] = 'autos'
+        client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(client.get('/api/table/cars').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get('/api/table/autos').json()['name'], 'autos')
+
+        ModelSchema.objects.get(name='autos').delete()
+        with listener_running():
+            self.assertEqual(client.get('/api/table/autos').status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(TABLES_SCHEMA_LISTENER=True)
+    def test_listener_not_running(self):
+        client.get('/api/table/cars')
+        schema = ModelSchema.objects.get(name='cars')
+        # the setting alone does not skip the version check, the listener of the process may be down
+        ModelSchema.objects.filter(pk=schema.pk).update(version=schema.version + 1, indexes=[])
+        self.assertEqual(client.get('/api/table/cars').json()['indexes'], [])
@@ -0,0 +1,56 @@
+import json
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableExportTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        Car.objects.create(model='Camry, "XV10"', sold=True)
+        Car.objects.create(model='Corolla')
+
+    def test_export_ndjson(self):
+        response = client.get('/api/table/cars/export')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': 1, 'model': 'Camry, "XV10"', 'sold': True},
+            {'id': 2, 'model': 'Corolla', 'sold': None},
+        ])
+
+    def test_export_csv(self):
+        response = client.get('/api/table/cars/export', data={'output': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'id,model,sold\r\n1,"Camry, ""XV10""",True\r\n2,Corolla,\r\n'
+        )
+
+    def test_export_invalid(self):
+        response = client.get('/api/table/cars/export', data={'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'output': ['"xml" is not a valid choice.']})
+
+        response = client.get('/api/table/trucks/export')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
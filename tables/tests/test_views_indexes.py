@@ -0,0 +1,128 @@
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableIndexesTestCase(TestCaseDynamicModels):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.table_data = {
+            'name': 'events',
+            'fields': [
+                {'name': 'kind', 'field_type': 'string'},
+                {'name': 'value', 'field_type': 'number', 'args': {'null': True}},
+                {'name': 'code', 'field_type': 'string', 'args': {'null': True}},
+            ],
+            'indexes': [
+                {'columns': ['kind', 'value']},
+                {'columns': ['code'], 'unique': True},
+                {'columns': ['value'], 'where': {'value__gt': 0}},
+                {'columns': ['id'], 'method': 'brin'},
+            ]
+        }
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get_indexes(self, table='dt_events'):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        return {
+            name: (constraint['columns'], constraint['unique'], constraint.get('type'))
+            for name, constraint in constraints.items()
+            if (constraint['index'] or constraint['unique']) and not constraint['primary_key']
+        }
+
+    def test_create_indexes(self):
+        schema = ModelSchema.objects.get(name='events')
+        names = [index['name'] for index in schema.indexes]
+
+        self.assertEqual(self.get_indexes(), {
+            names[0]: (['kind', 'value'], False, 'idx'),
+            names[1]: (['code'], True, None),
+            names[2]: (['value'], False, 'idx'),
+            names[3]: (['id'], False, 'brin'),
+        })
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexdef FROM pg_indexes WHERE indexname = %s', [names[2]])
+            self.assertIn('WHERE (value > (0.0)::double precision)', cursor.fetchone()[0])
+
+        response = client.post('/api/table/events/row', data={'kind': 'a', 'code': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = client.post('/api/table/events/row', data={'kind': 'b', 'code': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json(), {'non_field_errors': ['Row violates a unique index of the table.']})
+
+    def test_update_indexes(self):
+        old_names = [index['name'] for index in ModelSchema.objects.get(name='events').indexes]
+
+        self.table_data['name'] = 'renamed_events'
+        self.table_data['fields'] = self.table_data['fields'][:2]
+        self.table_data['indexes'] = [
+            {'columns': ['kind', 'value']},
+            {'columns': ['kind'], 'unique': True, 'where': {'value__isnull': False}},
+        ]
+        response = client.put('/api/table/events', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        new_names = [index['name'] for index in ModelSchema.objects.get(name='renamed_events').indexes]
+        # unchanged indexes are kept
+        self.assertEqual(new_names[0], old_names[0])
+        self.assertEqual(self.get_indexes('dt_renamed_events'), {
+            new_names[0]: (['kind', 'value'], False, 'idx'),
+            new_names[1]: (['kind'], True, 'idx'),
+        })
+
+    def test_invalid_indexes(self):
+        self.table_data['name'] = 'other'
+        self.table_data['indexes'] = [
+            {'columns': ['unknown']},
+            {'columns': ['kind'], 'unique': True, 'method': 'gin'},
+            {'columns': ['kind'], 'where': {'kind__startswith': 'a'}},
+        ]
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'indexes': [
+            {},
+            {'unique': ['Only btree indexes can be unique.']},
+            {'where': ['Unsupported lookup: kind__startswith']},
+        ]})
+
+        self.table_data['indexes'] = [{'columns': ['unknown']}]
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'indexes': ['Unknown index columns: unknown']})
+
+    def test_index_values_and_operator_classes(self):
+        self.table_data['name'] = 'other'
+        cases = [
+            ({'columns': ['kind'], 'method': 'gin'},
+             {'indexes': [{'opclasses': ['GIN indexes require an operator class for every column.']}]}),
+            ({'columns': ['kind'], 'method': 'gin', 'opclasses': ['jsonb_ops']},
+             {'indexes': ['Operator class jsonb_ops of gin is not available for kind.']}),
+            ({'columns': ['kind'], 'opclasses': ['no_such_ops']},
+             {'indexes': ['Operator class no_such_ops of btree is not available for kind.']}),
+            ({'columns': ['kind'], 'where': {'value__gt': 'abc'}},
+             {'indexes': ["Invalid value of value__gt: 'abc'"]}),
+            ({'columns': ['kind'], 'where': {'value__isnull': 'no'}},
+             {'indexes': ['Value of value__isnull should be a boolean.']}),
+        ]
+        for index, errors in cases:
+            with self.subTest(index=index):
+                self.table_data['indexes'] = [index]
+                response = client.post('/api/table', data=self.table_data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.json(), errors)
+
+        self.table_data['indexes'] = [
+            {'columns': ['kind'], 'opclasses': ['text_pattern_ops'], 'where': {'value__gte': '1.5'}},
+        ]
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
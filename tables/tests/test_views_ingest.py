@@ -0,0 +1,95 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableIngestTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        self.table_data = {
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'default': False}},
+            ]
+        }
+        response = client.post('/api/table', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.url = '/api/table/cars/ingest'
+        self.model = ModelSchema.objects.get(name='cars').as_model()
+
+    def rows(self):
+        return list(self.model.objects.order_by('id').values_list('model', 'price', 'sold'))
+
+    def test_ingest_csv(self):
+        body = 'model,price,sold\nCamry,"1000.5",true\n"Corolla, ""E10""",,0\n'
+        response = client.generic('POST', self.url, body, content_type='text/csv')
+
+        self.assertEqual(response.json(), {'rows': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {'rows': 2})
+        self.assertEqual(self.rows(), [('Camry', 1000.5, True), ('Corolla, "E10"', None, False)])
+
+    def test_ingest_ndjson(self):
+        body = '{"model": "Camry", "price": 1000}\n\n{"model": "", "sold": true}\n'
+        response = client.generic('POST', self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'line': 3, 'errors': {'model': ['This field cannot be blank.']}})
+        self.assertEqual(self.rows(), [])
+
+        body = '{"model": "Camry", "price": 1000}\n\n{"model": "\\"N", "sold": true}\n'
+        response = client.generic('POST', self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.rows(), [('Camry', 1000.0, False), ('"N', None, True)])
+
+    def test_ingest_invalid(self):
+        response = client.generic('POST', self.url, 'model,color\nCamry,red\n', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'line': 2, 'errors': ['Unknown columns: color']})
+
+        response = client.generic('POST', self.url, '[1, 2]\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'line': 1, 'errors': ['Expected a JSON object.']})
+
+        response = client.generic('POST', self.url, '{}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_ingest_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('model,price\nCamry,1\nCorolla,2\n')
+        self.addCleanup(os.remove, source.name)
+
+        stdout = StringIO()
+        call_command('ingest_table', 'cars', source.name, stdout=stdout)
+
+        self.assertIn('Loaded 2 rows into dt_cars', stdout.getvalue())
+        self.assertEqual(self.rows(), [('Camry', 1.0, False), ('Corolla', 2.0, False)])
+
+    def test_ingest_unique_violation(self):
+        self.table_data['indexes'] = [{'columns': ['model'], 'unique': True}]
+        response = client.put('/api/table/cars', data=self.table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.model = ModelSchema.objects.get(name='cars').as_model()
+
+        response = client.generic('POST', self.url, 'model\nCamry\nCorolla\nCamry\n', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json(), {'non_field_errors': ['Row violates a unique index of the table.']})
+        self.assertEqual(self.rows(), [])
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('model\nCamry\nCamry\n')
+        self.addCleanup(os.remove, source.name)
+        with self.assertRaisesMessage(CommandError, 'Row violates a unique index of the table.'):
+            call_command('ingest_table', 'cars', source.name, stdout=StringIO())
+        self.assertEqual(self.rows(), [])
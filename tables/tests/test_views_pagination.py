@@ -0,0 +1,91 @@
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableRowsPaginationTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'scores',
+            'fields': [
+                {'name': 'player', 'field_type': 'string'},
+                {'name': 'score', 'field_type': 'number', 'args': {'db_index': True}},
+                {'name': 'comment', 'field_type': 'string', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.model = ModelSchema.objects.get(name='scores').as_model()
+        for i, score in enumerate([5, 3, 5, 1, 3, 5, 2]):
+            self.model.objects.create(player=f'player {i}', score=score)
+        self.url = '/api/table/scores/rows'
+
+    def fetch_all_pages(self, **params):
+        rows, pages = [], 0
+        while True:
+            response = client.get(self.url, data=params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows += response.json()['results']
+            pages += 1
+            if response.json()['next'] is None:
+                return rows, pages
+            params['after'] = response.json()['next']
+
+    def test_paginate_by_id(self):
+        rows, pages = self.fetch_all_pages(limit=3)
+        self.assertEqual(pages, 3)
+        self.assertEqual([row['id'] for row in rows], sorted(self.model.objects.values_list('id', flat=True)))
+
+    def test_paginate_by_indexed_column(self):
+        rows, _ = self.fetch_all_pages(limit=2, order_by='score')
+        expected = list(self.model.objects.order_by('score', 'id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
+
+        rows, _ = self.fetch_all_pages(limit=2, order_by='-score')
+        expected = list(self.model.objects.order_by('-score', '-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
+
+    def test_unpaginated(self):
+        response = client.get(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 7)
+        self.assertNotIn('X-Rows-Truncated', response)
+
+    def test_unpaginated_reads_are_capped(self):
+        with self.settings(TABLES_ROWS_MAX_PAGE_SIZE=5):
+            response = client.get(self.url, data={'order_by': '-score'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([row['score'] for row in response.json()], [5, 5, 5, 3, 3])
+            self.assertEqual(response['X-Rows-Truncated'], 'true')
+
+            # the first rows by id, wherever updates moved them in the table
+            ids = sorted(self.model.objects.values_list('id', flat=True))
+            self.model.objects.filter(id=ids[0]).update(comment='updated')
+            response = client.get(self.url, format='json')
+            self.assertEqual([row['id'] for row in response.json()], ids[:5])
+
+    def test_invalid_params(self):
+        response = client.get(self.url, data={'limit': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('limit', response.json())
+
+        response = client.get(self.url, data={'limit': 2, 'order_by': 'player'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'order_by': ['Rows can be ordered only by indexed NOT NULL columns: player']
+        })
+
+        response = client.get(self.url, data={'after': 'not a cursor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'after': ['Invalid cursor.']})
+
+        cursor = client.get(self.url, data={'limit': 2}, format='json').json()['next']
+        response = client.get(self.url, data={'after': cursor, 'order_by': 'score'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'after': ['Cursor does not match the requested ordering.']})
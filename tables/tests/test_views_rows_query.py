@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableRowsQueryTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True, 'db_index': True}},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'default': False}},
+                {'name': 'notes', 'field_type': 'string', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Car = ModelSchema.objects.get(name='cars').as_model()
+        Car.objects.bulk_create([
+            Car(model='Camry', price=100, sold=True, notes='x' * 1000),
+            Car(model='Golf', price=50),
+            Car(model='Polo', price=70),
+            Car(model='Civic', price=None),
+        ])
+        self.url = '/api/table/cars/rows'
+
+    def test_filters_sorting_and_projection(self):
+        params = {'where.price__gte': '60', 'where.sold': 'false', 'order_by': '-price', 'fields': 'model,price'}
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{'model': 'Polo', 'price': 70.0}])
+        # only the projected columns are selected
+        self.assertNotIn('"notes"', queries.captured_queries[-1]['sql'])
+
+        response = client.get(self.url, {'where.model__in': 'Golf,Civic,Polo', 'order_by': 'sold,model', 'fields': 'model'})
+        self.assertEqual(response.json(), [{'model': 'Civic'}, {'model': 'Golf'}, {'model': 'Polo'}])
+
+        response = client.get(self.url, {'where.price__isnull': 'true', 'fields': 'model'})
+        self.assertEqual(response.json(), [{'model': 'Civic'}])
+
+    def test_paginated_projection_keeps_cursor_columns(self):
+        response = client.get(self.url, {'limit': 2, 'fields': 'model', 'where.model__startswith': 'C'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([set(row) for row in response.json()['results']], [{'model', 'id'}, {'model', 'id'}])
+        self.assertIsNone(response.json()['next'])
+
+    def test_invalid_params(self):
+        response = client.get(self.url, {'fields': 'model,color', 'order_by': 'price,colour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'order_by': ['Unknown column: colour'],
+            'fields': ['Unknown column: color'],
+        })
+
+        response = client.get(self.url, {'limit': 2, 'order_by': 'model,id'})
+        self.assertEqual(response.json(), {'order_by': ['Pages of rows can be ordered by a single column.']})
+
+        response = client.get(self.url, {'where.price__between': '1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'where.price__between': ['Unsupported lookup: between']})
@@ -0,0 +1,113 @@
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableRowsUpdateTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'vin', 'field_type': 'string', 'args': {'unique': True, 'null': True}},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+                {'name': 'sold', 'field_type': 'boolean', 'args': {'default': False}},
+                {'name': 'mileage', 'field_type': 'integer', 'args': {'null': True}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.Car = ModelSchema.objects.get(name='cars').as_model()
+        self.Car.objects.bulk_create([
+            self.Car(model='Camry', price=100),
+            self.Car(model='Golf', price=50),
+            self.Car(model='Polo', price=70),
+            self.Car(model='Civic', price=None),
+        ])
+
+    def url(self, **params):
+        return f'/api/table/cars/rows?{urlencode(params)}'
+
+    def test_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(self.url(**{'where.price__gte': 60}), data={'set': {'sold': True, 'price': 1}},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'rows': 2, 'batches': 1})
+        table_updates = [query for query in queries if query['sql'].startswith(f'UPDATE "{self.Car._meta.db_table}"')]
+        self.assertEqual(len(table_updates), 1)
+        self.assertEqual(
+            sorted(self.Car.objects.filter(sold=True).values_list('model', 'price')), [('Camry', 1), ('Polo', 1)]
+        )
+
+    def test_batched_update_and_delete(self):
+        self.Car.objects.bulk_create([self.Car(model=f'Car {i}', price=i) for i in range(20)])
+        response = client.patch(self.url(all='true', batch_size=5), data={'set': {'sold': True}}, format='json')
+        self.assertEqual(response.json(), {'rows': 24, 'batches': 5})
+        self.assertFalse(self.Car.objects.filter(sold=False).exists())
+
+        response = client.delete(self.url(**{'where.model__startswith': 'Car', 'batch_size': 8}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'rows': 20, 'batches': 3})
+        self.assertEqual(self.Car.objects.count(), 4)
+
+        response = client.delete(self.url(**{'where.model': 'Missing', 'batch_size': 8}))
+        self.assertEqual(response.json(), {'rows': 0, 'batches': 0})
+
+    def test_batches_of_sparse_ids(self):
+        self.Car.objects.create(id=10 ** 9, model='Model T')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(self.url(all='true', batch_size=2), data={'set': {'sold': True}}, format='json')
+        self.assertEqual(response.json(), {'rows': 5, 'batches': 3})
+        table_updates = [query for query in queries if query['sql'].startswith(f'UPDATE "{self.Car._meta.db_table}"')]
+        self.assertEqual(len(table_updates), 3)
+
+    def test_delete(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(self.url(**{'where.price__isnull': 'true'}))
+        self.assertEqual(response.json(), {'rows': 1, 'batches': 1})
+        # rows are not collected before the delete
+        table_queries = [query for query in queries if f'"{self.Car._meta.db_table}"' in query['sql']]
+        self.assertEqual(len(table_queries), 1)
+        self.assertTrue(table_queries[0]['sql'].startswith('DELETE'))
+        response = client.delete(self.url(all='true'))
+        self.assertEqual(response.json(), {'rows': 3, 'batches': 1})
+        self.assertFalse(self.Car.objects.exists())
+
+    def test_invalid_requests(self):
+        # every row has to be selected explicitly
+        response = client.delete(self.url())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.patch(self.url(), data={'set': {'sold': True}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for data in [{}, {'set': {}}, {'set': {'id': 1}}, {'set': {'color': 'red'}}, {'set': {'price': 'cheap'}}]:
+            with self.subTest(data=data):
+                response = client.patch(self.url(all='true'), data=data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.patch(self.url(**{'where.color': 'red'}), data={'set': {'sold': True}}, format='json')
+        self.assertEqual(response.json(), {'where.color': ['Unknown column: color']})
+        response = client.patch(self.url(all='true'), data={'set': {'mileage': 10 ** 12}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('mileage', response.json()['set'])
+        response = client.delete(self.url(all='true', batch_size=0))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.Car.objects.count(), 4)
+
+        response = client.patch('/api/table/missing/rows?all=true', data={'set': {'sold': True}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unique_violation(self):
+        response = client.patch(self.url(all='true'), data={'set': {'vin': 'A1'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = client.patch(self.url(**{'where.model': 'Golf'}), data={'set': {'vin': 'A1'}}, format='json')
+        self.assertEqual(response.json(), {'rows': 1, 'batches': 1})
@@ -0,0 +1,103 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tables.models import ModelSchema
+from .utils import TestCaseDynamicModels
+
+
+client = APIClient()
+
+
+class TableUpsertTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        response = client.post('/api/table', data={
+            'name': 'cars',
+            'fields': [
+                {'name': 'vin', 'field_type': 'string', 'args': {'unique': True, 'null': True}},
+                {'name': 'make', 'field_type': 'string'},
+                {'name': 'model', 'field_type': 'string'},
+                {'name': 'price', 'field_type': 'number', 'args': {'null': True}},
+            ],
+            'indexes': [{'columns': ['make', 'model'], 'unique': True}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.Car = ModelSchema.objects.get(name='cars').as_model()
+        self.url = '/api/table/cars/upsert'
+
+    def cars(self):
+        return list(self.Car.objects.order_by('id').values_list('vin', 'make', 'model', 'price'))
+
+    @override_settings(TABLES_BULK_INSERT_BATCH_SIZE=2)
+    def test_upsert_is_idempotent(self):
+        rows = [
+            {'vin': 'A1', 'make': 'Toyota', 'model': 'Camry', 'price': 100},
+            {'vin': 'B2', 'make': 'VW', 'model': 'Golf', 'price': 50},
+            {'vin': 'C3', 'make': 'VW', 'model': 'Polo', 'price': 70},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(self.url, data={'on': ['vin'], 'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'rows': 3})
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('INSERT')]), 2)
+
+        rows[1]['price'] = 55
+        rows.append({'vin': 'D4', 'make': 'Honda', 'model': 'Civic'})
+        response = client.post(self.url, data={'on': ['vin'], 'rows': rows[1:]}, format='json')
+        self.assertEqual(response.json(), {'rows': 3})
+        self.assertEqual(self.cars(), [
+            ('A1', 'Toyota', 'Camry', 100), ('B2', 'VW', 'Golf', 55), ('C3', 'VW', 'Polo', 70),
+            ('D4', 'Honda', 'Civic', None),
+        ])
+
+    def test_upsert_on_unique_index(self):
+        self.Car.objects.create(vin='A1', make='VW', model='Golf', price=50)
+        rows = [{'make': 'VW', 'model': 'Golf', 'price': 60}, {'make': 'VW', 'model': 'Polo', 'price': 70}]
+        response = client.post(self.url, data={'on': ['model', 'make'], 'update': ['price'], 'rows': rows},
+                               format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.cars(), [('A1', 'VW', 'Golf', 60), (None, 'VW', 'Polo', 70)])
+
+        # nothing to update, conflicting rows are left as they are
+        rows = [{'make': 'VW', 'model': 'Golf'}, {'make': 'VW', 'model': 'Up'}]
+        response = client.post(self.url, data={'on': ['make', 'model'], 'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'rows': 2})
+        self.assertEqual(self.cars()[0], ('A1', 'VW', 'Golf', 60))
+        self.assertEqual(len(self.cars()), 3)
+
+        # only conflicts on the `on` columns are resolved
+        rows = [{'vin': 'A1', 'make': 'VW', 'model': 'Passat'}]
+        response = client.post(self.url, data={'on': ['make', 'model'], 'update': [], 'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(self.cars()), 3)
+
+    def test_invalid_upserts(self):
+        row = {'vin': 'A1', 'make': 'VW', 'model': 'Golf'}
+        for data in [
+            {'on': ['price'], 'rows': [row]},
+            {'on': ['make'], 'rows': [row]},
+            {'on': ['color'], 'rows': [row]},
+            {'on': ['vin'], 'rows': []},
+            {'on': ['vin'], 'update': ['color'], 'rows': [row]},
+            {'on': ['vin'], 'rows': [{'vin': 'A1', 'make': 'VW'}]},
+            {'on': ['vin'], 'rows': [{'make': 'VW', 'model': 'Golf'}]},
+            {'on': ['vin'], 'rows': [row, row]},
+        ]:
+            with self.subTest(data=data):
+                response = client.post(self.url, data=data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.post(self.url, data={'on': ['vin'], 'rows': [row, row]}, format='json')
+        self.assertEqual(response.json(), {'rows': [{'index': 1, 'errors': {'on': ['Duplicates row 0.']}}]})
+        response = client.post(self.url, data={'on': ['id'], 'rows': [row]}, format='json')
+        self.assertEqual(response.json(), {'on': ['The primary key cannot be a conflict column.']})
+        self.assertEqual(self.cars(), [])
+
+    def test_conflict_on_another_unique_column(self):
+        self.Car.objects.create(vin='A1', make='VW', model='Golf')
+        rows = [{'vin': 'B2', 'make': 'VW', 'model': 'Golf'}]
+        response = client.post(self.url, data={'on': ['vin'], 'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tables.dynamic_models_cache import ModelCache
+from tables.models import FieldSchema, ModelSchema
+from tables.warmup import warm_up_models, warm_up_on_startup
+from .utils import TestCaseDynamicModels, all_dynamic_models_loaded
+
+
+class WarmUpTestCase(TestCaseDynamicModels):
+    def setUp(self):
+        super().setUp()
+        for name in ['Car', 'Truck', 'Bike']:
+            schema = ModelSchema.objects.create(name=name)
+            FieldSchema.objects.create(model_schema=schema, name='model', class_name='django.db.models.TextField')
+            FieldSchema.objects.create(model_schema=schema, name='price', class_name='django.db.models.FloatField')
+        ModelCache().clear()
+
+    def test_warm_up_models(self):
+        with self.assertLogs('tables.warmup', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            self.assertEqual(warm_up_models(), 3)
+        # the schemas and the fields of all of them
+        self.assertEqual(len(queries.captured_queries), 2)
+        self.assertIn('Warmed up 3 dynamic models', logs.output[0])
+        self.assertLessEqual({'car', 'truck', 'bike'}, all_dynamic_models_loaded())
+
+        # requests get the cached models without building them
+        with CaptureQueriesContext(connection) as queries:
+            schema = ModelSchema.objects.get(name='Truck')
+            model = schema.as_model()
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual([field.name for field in model._meta.fields], ['id', 'model', 'price'])
+
+    @mock.patch('tables.warmup.connections.close_all')
+    @mock.patch('tables.warmup.warm_up_models')
+    def test_warm_up_on_startup(self, warm_up, close_all):
+        warm_up_on_startup()
+        warm_up.assert_not_called()
+
+        with override_settings(TABLES_MODELS_WARMUP='eager'):
+            warm_up_on_startup()
+        warm_up.assert_called_once_with()
+        close_all.assert_called_once_with()
@@ -5,7 +5,7 @@ from tables.models import ModelSchema
 from tables.constants import TABLE_APP_LABEL
 
 
-DEFAULT_DYNAMIC_MODELS_SET = {'modelschema', 'fieldschema'}
+DEFAULT_DYNAMIC_MODELS_SET = {'modelschema', 'fieldschema', 'schemachangejob'}
 
 
 def all_dynamic_models_loaded() -> set[str]:
@@ -1,9 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if getattr(settings, 'TABLES_ASYNC_ROW_VIEWS', False):
+    insert_row_view = async_views.AsyncTableInsertRowView.as_view()
+    rows_view = async_views.AsyncTableRowsView.as_view()
+else:
+    insert_row_view = views.TableInsertRowAPIView.as_view()
+    rows_view = views.TableRowsAPIView.as_view()
 
 urlpatterns = [
     path('table', views.TableAPIView.as_view(), name='create_table'),
     path('table/<str:table_name>', views.TableAPIView.as_view(), name='update_table'),
-    path('table/<str:table_name>/row', views.TableInsertRowAPIView.as_view(), name='insert_into_table'),
-    path('table/<str:table_name>/rows', views.TableFetchRowsAPIView.as_view(), name='fetch_from_table'),
+    path('table/<str:table_name>/row', insert_row_view, name='insert_into_table'),
+    path('table/<str:table_name>/rows', rows_view, name='fetch_from_table'),
+    path('table/<str:table_name>/upsert', views.TableUpsertRowsAPIView.as_view(), name='upsert_into_table'),
+    path('table/<str:table_name>/aggregate', views.TableAggregateAPIView.as_view(), name='aggregate_table'),
+    path('table/<str:table_name>/ingest', views.TableIngestRowsAPIView.as_view(), name='ingest_into_table'),
+    path('table/<str:table_name>/export', views.TableExportRowsAPIView.as_view(), name='export_from_table'),
+    path('job/<int:job_id>', views.SchemaChangeJobAPIView.as_view(), name='schema_change_job'),
 ]
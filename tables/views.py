@@ -1,13 +1,55 @@
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.db import IntegrityError, transaction
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from .models import ModelSchema, FieldSchema
-from .serializers import TableSerializer, dynamic_serializer_for_model
+from .bulk_rows import delete_rows, update_rows
+from .conditional import get_cached_body, get_schema_etag, not_modified_response, set_cached_body, set_validators
+from .copy_ingest import INGEST_FORMATS, CopyIngest
+from .exceptions import IngestError, PartitioningError
+from .export import EXPORT_FORMATS
+from .filters import InvalidFilterError, parse_filters
+from .metrics import increment, instrument_view, metrics_enabled, registry as metrics_registry
+from .models import ModelSchema, FieldSchema, SchemaChangeJob
+from .schema_description import get_description
+from .schema_jobs import fail_stale_jobs
+from .serializers import (
+    AggregateSerializer, RowsMutationSerializer, RowsPageSerializer, RowsUpsertSerializer, RowValuesSerializer,
+    SchemaChangeJobSerializer, TableSerializer, dynamic_serializer_for_model, max_unpaginated_rows,
+    row_encoder_for_model,
+)
 from .table_editor import TableEditor
 
+# row serializers validate all column constraints except unique indexes
+UNIQUE_VIOLATION_ERROR = {'non_field_errors': ['Row violates a unique index of the table.']}
+JOB_IN_PROGRESS_ERROR = {'non_field_errors': ['A schema change of the table is in progress.']}
+TRUNCATED_HEADER = 'X-Rows-Truncated'
+
+
+def truncate_rows(rows):
+    """Return the rows of an unpaginated read, fetched one over the limit, cut to the limit and if they were cut."""
+    limit = max_unpaginated_rows()
+    return (rows[:limit], True) if len(rows) > limit else (rows, False)
+
 
 class TableAPIView(APIView):
+    def get(self, request, table_name=None):
+        if table_name is None:
+            return self.http_method_not_allowed(request)
+        try:
+            schema_pk, description = get_description(table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        etag = get_schema_etag(schema_pk, description['version'])
+        response = get_conditional_response(request, etag=etag) or Response(description, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
     def post(self, request):
         serializer = TableSerializer(data=request.data)
         if serializer.is_valid():
@@ -17,16 +59,43 @@ class TableAPIView(APIView):
 
     def put(self, request, table_name):
         serializer = TableSerializer(data=request.data)
-        if serializer.is_valid():
-            try:
-                TableEditor(serializer.validated_data).update(table_name)
-            except ModelSchema.DoesNotExist:
-                return Response(status=status.HTTP_404_NOT_FOUND)
-            return Response(status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        # queued changes are applied in order, a direct update would race with them
+        fail_stale_jobs()
+        if schema.jobs.filter(status__in=[SchemaChangeJob.PENDING, SchemaChangeJob.RUNNING]).exists():
+            return Response(JOB_IN_PROGRESS_ERROR, status=status.HTTP_409_CONFLICT)
+
+        editor = TableEditor(serializer.validated_data)
+        try:
+            editor.check_partitioning(schema)
+        except PartitioningError as err:
+            return Response({'partitioning': [str(err)]}, status=status.HTTP_400_BAD_REQUEST)
+        if getattr(settings, 'TABLES_ASYNC_SCHEMA_CHANGES', False) and editor.rewrites_data(schema):
+            job = SchemaChangeJob.objects.create(model_schema=schema, data=serializer.validated_data)
+            url = request.build_absolute_uri(reverse('schema_change_job', args=[job.pk]))
+            return Response({'job': job.pk, 'url': url}, status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+        editor.update(table_name)
+        return Response(status=status.HTTP_200_OK)
+
+
+class SchemaChangeJobAPIView(APIView):
+    def get(self, request, job_id):
+        try:
+            job = SchemaChangeJob.objects.select_related('model_schema').get(pk=job_id)
+        except SchemaChangeJob.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(SchemaChangeJobSerializer(job).data, status=status.HTTP_200_OK)
 
 
 class TableInsertRowAPIView(APIView):
+    @instrument_view
     def post(self, request, table_name):
         try:
             schema = ModelSchema.objects.get(name=table_name)
@@ -37,12 +106,173 @@ class TableInsertRowAPIView(APIView):
         serializer = dynamic_serializer_for_model(model)(data=request.data)
 
         if serializer.is_valid():
-            instance = serializer.save()
+            try:
+                with transaction.atomic():
+                    instance = serializer.save()
+            except IntegrityError:
+                return Response(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+            schema.bump_data_version()
+            increment('rows', table=table_name, operation='insert')
             return Response({'id': instance.pk}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TableFetchRowsAPIView(APIView):
+class TableRowsAPIView(APIView):
+    @instrument_view
+    def get(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        model = schema.as_model()
+        params = RowsPageSerializer(data=request.query_params, context={'model': model})
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # the versions were loaded with the schema, before the rows
+        not_modified = not_modified_response(request, schema)
+        if not_modified is not None:
+            return set_validators(not_modified, schema)
+        body = get_cached_body(schema, request)
+        if body is None:
+            body = self.get_body(table_name, params)
+            set_cached_body(schema, request, body)
+        if params.is_paginated:
+            return set_validators(Response(body, status=status.HTTP_200_OK), schema)
+        rows, truncated = truncate_rows(body)
+        response = Response(rows, status=status.HTTP_200_OK)
+        if truncated:
+            response[TRUNCATED_HEADER] = 'true'
+        return set_validators(response, schema)
+
+    @staticmethod
+    def get_body(table_name, params):
+        encoder, queryset = params.get_encoder(), params.get_queryset()
+        if not params.is_paginated:
+            rows = encoder.encode_rows(queryset)
+            increment('rows', len(rows), table=table_name, operation='fetch')
+            return rows
+
+        rows, next_cursor = params.get_paginator().paginate(queryset, encoder, after=params.validated_data.get('after'))
+        increment('rows', len(rows), table=table_name, operation='fetch')
+        return {'results': rows, 'next': next_cursor}
+
+    @instrument_view
+    def post(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        model = schema.as_model()
+        serializer = dynamic_serializer_for_model(model)(
+            data=request.data, many=True, allow_empty=False,
+            max_length=getattr(settings, 'TABLES_BULK_INSERT_MAX_ROWS', 10000),
+        )
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                # report only invalid rows, with their positions in the request
+                errors = {'rows': [{'index': i, 'errors': row_errors} for i, row_errors in enumerate(errors) if row_errors]}
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = getattr(settings, 'TABLES_BULK_INSERT_BATCH_SIZE', 1000)
+        try:
+            with transaction.atomic():
+                instances = model.objects.bulk_create(
+                    [model(**data) for data in serializer.validated_data], batch_size=batch_size
+                )
+        except IntegrityError:
+            return Response(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        schema.bump_data_version()
+        increment('rows', len(instances), table=table_name, operation='insert')
+        return Response({'ids': [instance.pk for instance in instances]}, status=status.HTTP_201_CREATED)
+
+    @instrument_view
+    def patch(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        model = schema.as_model()
+        params = RowsMutationSerializer(data=request.query_params, context={'model': model})
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        values = RowValuesSerializer(data=request.data, context={'model': model})
+        if not values.is_valid():
+            return Response(values.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = model.objects.filter(params.validated_data['where'])
+        try:
+            rows, batches = update_rows(queryset, values.validated_data['set'], params.validated_data['batch_size'])
+        except IntegrityError:
+            return Response(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        finally:
+            # batches committed before a failure changed the rows too
+            schema.bump_data_version()
+        increment('rows', rows, table=table_name, operation='update')
+        return Response({'rows': rows, 'batches': batches}, status=status.HTTP_200_OK)
+
+    @instrument_view
+    def delete(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        model = schema.as_model()
+        params = RowsMutationSerializer(data=request.query_params, context={'model': model})
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = model.objects.filter(params.validated_data['where'])
+        rows, batches = delete_rows(queryset, params.validated_data['batch_size'])
+        schema.bump_data_version()
+        increment('rows', rows, table=table_name, operation='delete')
+        return Response({'rows': rows, 'batches': batches}, status=status.HTTP_200_OK)
+
+
+class TableUpsertRowsAPIView(APIView):
+    @instrument_view
+    def post(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        model = schema.as_model()
+        serializer = RowsUpsertSerializer(data=request.data, context={'model': model})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, errors = serializer.get_rows()
+        if errors:
+            return Response({'rows': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # a single INSERT ... ON CONFLICT (on) DO UPDATE per batch, every row is inserted or matches an existing one;
+        # with nothing to update the conflict columns are set to themselves, `ignore_conflicts` would skip
+        # conflicts on any unique column instead of reporting them
+        on = serializer.validated_data['on']
+        update_fields = serializer.get_update_fields(rows) or on
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**row) for row in rows],
+                    batch_size=getattr(settings, 'TABLES_BULK_INSERT_BATCH_SIZE', 1000),
+                    update_conflicts=True, unique_fields=on, update_fields=update_fields,
+                )
+        except IntegrityError:
+            # a conflict on another unique column
+            return Response(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        schema.bump_data_version()
+        increment('rows', len(rows), table=table_name, operation='upsert')
+        return Response({'rows': len(rows)}, status=status.HTTP_200_OK)
+
+
+class TableAggregateAPIView(APIView):
+    @instrument_view
     def get(self, request, table_name):
         try:
             schema = ModelSchema.objects.get(name=table_name)
@@ -50,6 +280,92 @@ class TableFetchRowsAPIView(APIView):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
         model = schema.as_model()
-        queryset = model.objects.all()
-        serializer = dynamic_serializer_for_model(model)(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        params = AggregateSerializer(data=request.query_params, context={'model': model})
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = model.objects.filter(parse_filters(model, request.query_params))
+        except InvalidFilterError as err:
+            return Response(err.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        not_modified = not_modified_response(request, schema)
+        if not_modified is not None:
+            return set_validators(not_modified, schema)
+        body = get_cached_body(schema, request, prefix='aggregate')
+        if body is None:
+            group_by = params.validated_data['group_by']
+            aggregates = params.get_aggregates()
+            if group_by:
+                rows = list(queryset.values(*group_by).annotate(**aggregates).order_by(*group_by))
+            else:
+                rows = [queryset.aggregate(**aggregates)]
+            increment('rows', len(rows), table=table_name, operation='aggregate')
+            body = {'results': [params.to_result(row) for row in rows]}
+            set_cached_body(schema, request, body, prefix='aggregate')
+        return set_validators(Response(body, status=status.HTTP_200_OK), schema)
+
+
+class TableExportRowsAPIView(APIView):
+    @instrument_view
+    def get(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        # `?format=` is taken by DRF content negotiation
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'output': [f'"{output}" is not a valid choice.']}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = schema.as_model()
+        encoder = row_encoder_for_model(model)
+        chunk_size = getattr(settings, 'TABLES_EXPORT_CHUNK_SIZE', 2000)
+        rows = encoder.iter_rows(model.objects.order_by(model._meta.pk.name), chunk_size)
+
+        content_type, lines = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(lines(encoder.field_names, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{schema.table_name}.{output}"'
+        return response
+
+
+class TableIngestRowsAPIView(APIView):
+    CONTENT_TYPES = {
+        'text/csv': 'csv',
+        'application/x-ndjson': 'ndjson',
+    }
+
+    @instrument_view
+    def post(self, request, table_name):
+        try:
+            schema = ModelSchema.objects.get(name=table_name)
+        except ModelSchema.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in self.CONTENT_TYPES:
+            return Response(status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        # read the body line by line, without loading it into memory
+        lines = (line.decode('utf-8') for line in (request.stream or []))
+        records = INGEST_FORMATS[self.CONTENT_TYPES[content_type]](lines)
+        try:
+            rows = CopyIngest(schema.as_model()).ingest(records)
+        except IngestError as err:
+            return Response({'line': err.line, 'errors': err.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({'errors': ['Body is not valid UTF-8.']}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response(UNIQUE_VIOLATION_ERROR, status=status.HTTP_409_CONFLICT)
+        schema.bump_data_version()
+        increment('rows', rows, table=table_name, operation='ingest')
+        return Response({'rows': rows}, status=status.HTTP_201_CREATED)
+
+
+class MetricsView(APIView):
+    def get(self, request):
+        if not metrics_enabled():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,43 @@
+"""Build the dynamic models of all tables ahead of traffic, run by the WSGI/ASGI entry points."""
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from . import metrics
+from .models import ModelSchema
+from .serializers import dynamic_serializer_for_model, row_encoder_for_model
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_models():
+    """Register the models, serializers and row encoders of all tables, return their number."""
+    start = time.perf_counter()
+    # fields of all schemas are loaded by a single prefetch query
+    schemas = list(ModelSchema.objects.prefetch_related('fields'))
+    for schema in schemas:
+        model = schema.as_model()
+        dynamic_serializer_for_model(model)
+        row_encoder_for_model(model)
+
+    duration = time.perf_counter() - start
+    metrics.registry.observe('warmup', duration)
+    logger.info('Warmed up %d dynamic models in %.3fs', len(schemas), duration)
+    return len(schemas)
+
+
+def warm_up_on_startup():
+    """Warm up the models of a server process with `TABLES_MODELS_WARMUP = 'eager'`."""
+    # 'eager' builds all models at startup, 'lazy' builds each one on its first request
+    if getattr(settings, 'TABLES_MODELS_WARMUP', 'lazy') != 'eager':
+        return
+    try:
+        warm_up_models()
+    except DatabaseError:
+        # e.g. `migrate` of a new database, before the schema tables exist
+        logger.warning('Dynamic models warm-up skipped, the database is not ready', exc_info=True)
+    finally:
+        # forked workers must not share the connection of the parent process
+        connections.close_all()